@@ -0,0 +1,132 @@
+import re
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+WORD_RE = re.compile(r"[\w+#.]+")
+# Upper bound of each suggestion kind's score
+KIND_WEIGHTS = {"topic": 1.0, "project": 0.75, "skill": 0.7, "platform": 0.5}
+
+# (sort key, suggestion); the sort key is (-score, text) so an ascending sort ranks best first
+Ranked = Tuple[Tuple[float, str], Dict[str, str]]
+
+
+class _Node:
+    __slots__ = ("edges", "entries", "top")
+
+    def __init__(self):
+        self.edges: Dict[str, Tuple[str, "_Node"]] = {}  # first char -> (label, child)
+        self.entries: List[Ranked] = []
+        self.top: List[Ranked] = []
+
+
+def _common_prefix(a: str, b: str) -> int:
+    n = min(len(a), len(b))
+    i = 0
+    while i < n and a[i] == b[i]:
+        i += 1
+    return i
+
+
+class CompressedTrie:
+    """Radix trie whose nodes cache the top-k suggestions of their subtree.
+
+    A lookup walks at most len(prefix) characters and returns the cached list,
+    so per-query work doesn't depend on how many keys share the prefix.
+    """
+
+    def __init__(self, k: int = 10):
+        self.k = k
+        self.root = _Node()
+
+    def insert(self, key: str, suggestion: Dict[str, str], score: float):
+        node = self.root
+        rest = key
+        while rest:
+            edge = node.edges.get(rest[0])
+            if edge is None:
+                child = _Node()
+                node.edges[rest[0]] = (rest, child)
+                node = child
+                break
+            label, child = edge
+            common = _common_prefix(label, rest)
+            if common < len(label):
+                # Split the edge at the point where the keys diverge
+                middle = _Node()
+                middle.edges[label[common]] = (label[common:], child)
+                node.edges[rest[0]] = (label[:common], middle)
+                child = middle
+            node = child
+            rest = rest[common:]
+        node.entries.append(((-score, suggestion["text"]), suggestion))
+
+    def finalize(self):
+        self._finalize(self.root)
+
+    def _finalize(self, node: _Node) -> List[Ranked]:
+        candidates = list(node.entries)
+        for _, child in node.edges.values():
+            candidates.extend(self._finalize(child))
+        seen = set()
+        top = []
+        for rank, suggestion in sorted(candidates, key=lambda c: c[0]):
+            identity = (suggestion["type"], suggestion.get("id"), suggestion["text"])
+            if identity in seen:
+                continue
+            seen.add(identity)
+            top.append((rank, suggestion))
+            if len(top) == self.k:
+                break
+        node.top = top
+        node.entries = []
+        return top
+
+    def complete(self, prefix: str, k: Optional[int] = None) -> List[Dict[str, str]]:
+        node = self.root
+        rest = prefix
+        while rest:
+            edge = node.edges.get(rest[0])
+            if edge is None:
+                return []
+            label, child = edge
+            if label.startswith(rest):
+                node = child
+                break
+            if not rest.startswith(label):
+                return []
+            node = child
+            rest = rest[len(label):]
+        return [suggestion for _, suggestion in node.top[:k or self.k]]
+
+
+def normalize_prefix(text: str) -> str:
+    return " ".join(text.lower().split())
+
+
+def build_autocomplete(topics: List[Dict[str, Any]], projects: List[Dict[str, Any]], k: int = 10) -> CompressedTrie:
+    trie = CompressedTrie(k)
+
+    def add_title(item: Dict[str, Any], item_type: str, score: float):
+        suggestion = {"text": item["title"], "type": item_type, "id": item["id"]}
+        title = normalize_prefix(item["title"])
+        # Index every word start so "sql" also finds "Advanced SQL"
+        for match in WORD_RE.finditer(title):
+            trie.insert(title[match.start():], suggestion, score)
+
+    # Each kind is scored on its own 0..1 scale (titles by catalog order, skills and
+    # platforms by frequency relative to the most frequent one) and then weighted,
+    # so a common platform can't outrank a title that matches the prefix
+    for topic in topics:
+        add_title(topic, "topic", KIND_WEIGHTS["topic"] * (0.75 + 0.25 / (1 + max(topic.get("order", 0), 0))))
+    for project in projects:
+        add_title(project, "project", KIND_WEIGHTS["project"])
+
+    skills = Counter(s for p in projects for s in p.get("skills", []))
+    platforms = Counter(r["platform"] for item in topics + projects for r in item.get("resources", []) if r.get("platform"))
+    for kind, counts in (("skill", skills), ("platform", platforms)):
+        top_count = max(counts.values(), default=1)
+        for text, count in counts.items():
+            trie.insert(normalize_prefix(text), {"text": text, "type": kind}, KIND_WEIGHTS[kind] * count / top_count)
+
+    trie.finalize()
+    return trie
@@ -0,0 +1,101 @@
+"""Micro-benchmark for the trusted-document response fast path.
+
+Compares what FastAPI does for a route with a response_model (validate the
+returned documents, jsonable_encoder, json.dumps) against the fast path
+(orjson.dumps on the raw documents; the session's User is validated once and
+served from the session cache).
+
+    python bench_serialization.py
+"""
+import json
+import os
+import timeit
+import uuid
+from typing import List
+
+import orjson
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+
+os.environ.setdefault('MONGO_URL', 'mongodb://localhost:27017')
+os.environ.setdefault('DB_NAME', 'bench')
+
+from cache_bus import DocumentCache, InvalidationBus  # noqa: E402
+from server import Project, Topic, User  # noqa: E402
+
+
+def make_topic(i: int) -> dict:
+    return {
+        "id": str(uuid.uuid4()),
+        "title": f"Topic {i}",
+        "description": "Master SQL queries, joins, aggregations, and database fundamentals " * 3,
+        "difficulty": "Beginner",
+        "duration": "3 weeks",
+        "prerequisites": ["Introduction to Data Analytics"],
+        "career_paths": ["Data Analyst", "Business Analyst", "Data Engineer", "Data Scientist"],
+        "resources": [
+            {"id": str(uuid.uuid4()), "title": f"Course {n}", "url": f"https://www.coursera.org/learn/{i}-{n}",
+             "platform": "Coursera", "type": "FREE"}
+            for n in range(5)
+        ],
+        "order": i,
+    }
+
+
+def make_project(i: int) -> dict:
+    return {
+        "id": str(uuid.uuid4()),
+        "title": f"Project {i}",
+        "description": "Analyze sales data to find trends and build a dashboard " * 3,
+        "difficulty": "Intermediate",
+        "skills": ["SQL", "Python", "Tableau"],
+        "resources": make_topic(i)["resources"][:3],
+        "github_link": None,
+        "estimated_time": "2-4 weeks",
+        "career_paths": ["Data Analyst"],
+    }
+
+
+def fastapi_serialize(adapter: TypeAdapter, content) -> bytes:
+    # Mirrors fastapi.routing.serialize_response + JSONResponse.render
+    validated = adapter.validate_python(content)
+    return json.dumps(
+        jsonable_encoder(validated), ensure_ascii=False, allow_nan=False, separators=(",", ":")
+    ).encode("utf-8")
+
+
+def bench(label: str, slow, fast, number: int):
+    slow_us = timeit.timeit(slow, number=number) / number * 1e6
+    fast_us = timeit.timeit(fast, number=number) / number * 1e6
+    print(f"{label:<28}{slow_us:>12.1f}{fast_us:>12.1f}{slow_us - fast_us:>12.1f}{slow_us / fast_us:>9.1f}x")
+
+
+def main():
+    topics = [make_topic(i) for i in range(50)]
+    projects = [make_project(i) for i in range(50)]
+    user = {
+        "id": str(uuid.uuid4()), "email": "user@example.com", "name": "User", "picture": None,
+        "auth_provider": "emergent", "enrolled_paths": ["Data Analyst"], "preferences": {},
+        "created_at": "2025-01-01T00:00:00+00:00",
+    }
+    topic_list = TypeAdapter(List[Topic])
+    project_list = TypeAdapter(List[Project])
+    topic_one = TypeAdapter(Topic)
+    user_one = TypeAdapter(User)
+    sessions = DocumentCache(InvalidationBus(None), ("sessions", "users"))
+    sessions.bus.streaming = True
+    sessions.set("token", User(**user), [("users", user["id"])], sessions.generation)
+
+    print(f"{'route (us per request)':<28}{'validated':>12}{'fast path':>12}{'saved':>12}{'speedup':>10}")
+    bench("GET /topics (50)", lambda: fastapi_serialize(topic_list, topics), lambda: orjson.dumps(topics), 200)
+    bench("GET /projects (50)", lambda: fastapi_serialize(project_list, projects), lambda: orjson.dumps(projects), 200)
+    bench("GET /topics/{id}", lambda: fastapi_serialize(topic_one, topics[0]), lambda: orjson.dumps(topics[0]), 5000)
+    bench("PUT /topics/{id}", lambda: fastapi_serialize(topic_one, Topic(**topics[0])),
+          lambda: orjson.dumps(topics[0]), 5000)
+    bench("get_current_user", lambda: User(**user), lambda: sessions.get("token"), 20000)
+    bench("GET /auth/me", lambda: fastapi_serialize(user_one, User(**user)),
+          lambda: orjson.dumps(sessions.get("token").model_dump()), 5000)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,257 @@
+import asyncio
+import inspect
+import logging
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterable, List, Optional, Set, Tuple, Union
+
+from pymongo.errors import OperationFailure, PyMongoError
+
+logger = logging.getLogger(__name__)
+
+WATCHED_COLLECTIONS = ("topics", "projects", "users", "sessions")
+
+# Server error codes that mean the stream can never work (standalone mongod)
+# or that our stored resume token points past the oplog window.
+NOT_REPLICA_SET_CODES = {40573, 20}
+HISTORY_LOST_CODES = {286, 280, 260}
+
+
+@dataclass(frozen=True)
+class InvalidationEvent:
+    collection: str
+    operation: str  # 'insert', 'update', 'replace', 'delete', 'refresh'
+    version: int
+    doc_id: Optional[str] = None  # app-level 'id' when known
+    object_id: Optional[str] = None  # Mongo _id from the change stream
+
+
+Subscriber = Callable[[InvalidationEvent], Union[None, Awaitable[None]]]
+Tag = Tuple[str, str]  # (collection, app-level id or Mongo _id)
+
+
+class InvalidationBus:
+    """Fans MongoDB change stream events out to in-process cache subscribers.
+
+    Every event bumps a per-collection version, so caches only need to remember
+    which version they were filled at. Resume tokens are persisted so a restarted
+    worker picks up where it left off; when the stream cannot be resumed every
+    subscriber gets a 'refresh' event instead.
+    """
+
+    def __init__(
+        self,
+        db,
+        collections: Iterable[str] = WATCHED_COLLECTIONS,
+        token_collection: str = "cache_resume_tokens",
+        stream_name: str = "invalidation_bus",
+        token_save_interval: float = 1.0,
+        retry_delay: float = 1.0,
+        max_retry_delay: float = 30.0,
+    ):
+        self.db = db
+        self.collections = tuple(collections)
+        self.token_collection = token_collection
+        self.stream_name = stream_name
+        self.token_save_interval = token_save_interval
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        self.versions: Dict[str, int] = {c: 0 for c in self.collections}
+        self.streaming = False
+        self._subscribers: Dict[str, List[Subscriber]] = {c: [] for c in self.collections}
+        self._task: Optional[asyncio.Task] = None
+        self._last_token_save = 0.0
+
+    def watch_collection(self, collection: str):
+        """Register an extra collection; must be called before start()."""
+        if collection not in self.versions:
+            self.collections += (collection,)
+            self.versions[collection] = 0
+            self._subscribers[collection] = []
+
+    def subscribe(self, collections: Iterable[str], callback: Subscriber):
+        for collection in collections:
+            self._subscribers[collection].append(callback)
+
+    def version_of(self, collections: Iterable[str]) -> Tuple[int, ...]:
+        return tuple(self.versions[c] for c in collections)
+
+    async def publish(
+        self,
+        collection: str,
+        operation: str,
+        doc_id: Optional[str] = None,
+        object_id: Optional[str] = None,
+    ) -> InvalidationEvent:
+        self.versions[collection] += 1
+        event = InvalidationEvent(
+            collection=collection,
+            operation=operation,
+            version=self.versions[collection],
+            doc_id=doc_id,
+            object_id=object_id,
+        )
+        for callback in self._subscribers[collection]:
+            try:
+                result = callback(event)
+                if inspect.isawaitable(result):
+                    await result
+            except Exception:
+                logger.exception("Invalidation subscriber failed for %s", collection)
+        return event
+
+    async def refresh_all(self):
+        for collection in self.collections:
+            await self.publish(collection, "refresh")
+
+    async def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self.streaming = False
+
+    # ===== RESUME TOKENS =====
+    async def _load_token(self) -> Optional[Dict[str, Any]]:
+        doc = await self.db[self.token_collection].find_one({"_id": self.stream_name})
+        return doc.get("token") if doc else None
+
+    async def _save_token(self, token, force: bool = False):
+        now = time.monotonic()
+        if token is None or (not force and now - self._last_token_save < self.token_save_interval):
+            return
+        self._last_token_save = now
+        await self.db[self.token_collection].update_one(
+            {"_id": self.stream_name},
+            {"$set": {"token": token}},
+            upsert=True,
+        )
+
+    async def _clear_token(self):
+        await self.db[self.token_collection].delete_one({"_id": self.stream_name})
+
+    # ===== STREAM =====
+    async def _run(self):
+        delay = self.retry_delay
+        while True:
+            try:
+                await self._follow()
+                delay = self.retry_delay
+            except asyncio.CancelledError:
+                raise
+            except OperationFailure as e:
+                self.streaming = False
+                if e.code in NOT_REPLICA_SET_CODES:
+                    logger.warning("Change streams unavailable (%s); cache invalidation is local only", e)
+                    return
+                if e.code in HISTORY_LOST_CODES:
+                    logger.warning("Change stream history lost; forcing full cache refresh")
+                    await self._clear_token()
+                else:
+                    logger.warning("Change stream failed: %s", e)
+                await self.refresh_all()
+            except PyMongoError as e:
+                self.streaming = False
+                logger.warning("Change stream interrupted: %s", e)
+                await self.refresh_all()
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self.max_retry_delay)
+
+    async def _follow(self):
+        token = await self._load_token()
+        pipeline = [{"$match": {"ns.coll": {"$in": list(self.collections)}}}]
+        # updateLookup gives update events the document, and with it the app-level id
+        async with self.db.watch(pipeline, resume_after=token, full_document="updateLookup") as stream:
+            self.streaming = True
+            try:
+                async for change in stream:
+                    await self._dispatch(change)
+                    await self._save_token(stream.resume_token)
+            finally:
+                await self._save_token(stream.resume_token, force=True)
+
+    async def _dispatch(self, change: Dict[str, Any]):
+        operation = change["operationType"]
+        collection = change.get("ns", {}).get("coll")
+        if operation in ("drop", "rename", "dropDatabase", "invalidate") or collection not in self.versions:
+            await self.refresh_all()
+            return
+        full_document = change.get("fullDocument") or {}
+        object_id = change.get("documentKey", {}).get("_id")
+        await self.publish(
+            collection,
+            operation,
+            doc_id=full_document.get("id"),
+            object_id=str(object_id) if object_id is not None else None,
+        )
+
+
+class DocumentCache:
+    """In-process cache whose entries expire when a document they were read from changes.
+
+    Each entry is tagged with the (collection, id) pairs it was built from, using
+    app-level ids and/or Mongo _ids. An update, replace or delete drops only the
+    entries tagged with that document; inserts can't affect cached entries and
+    are ignored. Entries are only served while the bus is following the change
+    stream; otherwise writes on other workers would go unnoticed.
+    """
+
+    def __init__(self, bus: InvalidationBus, collections: Iterable[str], maxsize: int = 10000):
+        self.bus = bus
+        self.collections = tuple(collections)
+        self.maxsize = maxsize
+        # Bumped on every event that may drop entries, so a fill that raced
+        # with one can be rejected
+        self.generation = 0
+        self._entries: Dict[Hashable, Tuple[Tuple[Tag, ...], Any]] = {}
+        self._tagged: Dict[Tag, Set[Hashable]] = {}
+        bus.subscribe(self.collections, self._on_event)
+
+    def _on_event(self, event: InvalidationEvent):
+        if event.operation == "insert":
+            return
+        self.generation += 1
+        if event.operation == "refresh":
+            self._entries.clear()
+            self._tagged.clear()
+            return
+        for doc_key in (event.doc_id, event.object_id):
+            if doc_key is not None:
+                for key in list(self._tagged.get((event.collection, doc_key), ())):
+                    self.delete(key)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        if not self.bus.streaming:
+            return None
+        entry = self._entries.get(key)
+        return entry[1] if entry is not None else None
+
+    def set(self, key: Hashable, value: Any, tags: Iterable[Tag], generation: int):
+        """Store a value whose reads started when the cache was at `generation`."""
+        if not self.bus.streaming or generation != self.generation:
+            return
+        self.delete(key)
+        if len(self._entries) >= self.maxsize:
+            self.delete(next(iter(self._entries)))
+        tags = tuple(tags)
+        self._entries[key] = (tags, value)
+        for tag in tags:
+            self._tagged.setdefault(tag, set()).add(key)
+
+    def delete(self, key: Hashable):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for tag in entry[0]:
+            keys = self._tagged.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tagged[tag]
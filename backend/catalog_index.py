@@ -0,0 +1,61 @@
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Tuple
+
+from cache_bus import InvalidationBus
+
+logger = logging.getLogger(__name__)
+
+CATALOG_COLLECTIONS = ("topics", "projects", "resources")
+
+CatalogLoader = Callable[[], Awaitable[Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]]]
+IndexBuilder = Callable[[List[Dict[str, Any]], List[Dict[str, Any]]], Any]
+
+
+class CatalogIndexes:
+    """In-memory indexes derived from a snapshot of every topic and project.
+
+    Indexes are rebuilt lazily on the first lookup after a catalog write seen by
+    the invalidation bus. While the bus is not following the change stream,
+    writes on other workers go unnoticed, so snapshots also expire after
+    `max_age` seconds.
+    """
+
+    def __init__(self, bus: InvalidationBus, loader: CatalogLoader, max_age: float = 60.0):
+        self.bus = bus
+        self.loader = loader
+        self.max_age = max_age
+        self._builders: Dict[str, IndexBuilder] = {}
+        self._indexes: Dict[str, Any] = {}
+        self._version = None
+        self._built_at = 0.0
+        self._lock = asyncio.Lock()
+
+    def register(self, name: str, builder: IndexBuilder):
+        self._builders[name] = builder
+        self._version = None
+
+    def _is_fresh(self) -> bool:
+        if self._version != self.bus.version_of(CATALOG_COLLECTIONS):
+            return False
+        return self.bus.streaming or time.monotonic() - self._built_at < self.max_age
+
+    async def get(self, name: str) -> Any:
+        if not self._is_fresh():
+            async with self._lock:
+                if not self._is_fresh():
+                    await self._rebuild()
+        return self._indexes[name]
+
+    async def _rebuild(self):
+        version = self.bus.version_of(CATALOG_COLLECTIONS)
+        started = time.perf_counter()
+        topics, projects = await self.loader()
+        self._indexes = {name: build(topics, projects) for name, build in self._builders.items()}
+        self._version = version
+        self._built_at = time.monotonic()
+        logger.info(
+            "Rebuilt catalog indexes (%d topics, %d projects) in %.1f ms",
+            len(topics), len(projects), (time.perf_counter() - started) * 1000
+        )
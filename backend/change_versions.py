@@ -0,0 +1,103 @@
+import uuid
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+from typing import AsyncIterator, Dict, Iterable, List, Tuple
+
+from pymongo.errors import DuplicateKeyError
+
+
+class ChangeVersions:
+    """Allocates the change versions delta sync clients page through.
+
+    A writer holds a reservation while it writes: the versions are stamped on
+    the documents and the reservation is released once the write is
+    acknowledged. Reservations are recorded in the same atomic update that
+    advances the counter, so `watermark()` never passes a version whose write
+    may not be visible yet. A reservation left behind by a crashed writer stops
+    holding the watermark back after `ttl`.
+    """
+
+    def __init__(self, collection, name: str = "change_version", ttl: timedelta = timedelta(minutes=5)):
+        self.collection = collection
+        self.name = name
+        self.ttl = ttl
+
+    @asynccontextmanager
+    async def reserve(self, count: int = 1) -> AsyncIterator[int]:
+        """Reserve `count` consecutive versions and yield the first one."""
+        token, first = await self._reserve(count)
+        try:
+            yield first
+        finally:
+            await self.collection.update_one({"_id": self.name}, {"$pull": {"pending": {"token": token}}})
+
+    async def _reserve(self, count: int) -> Tuple[str, int]:
+        token = str(uuid.uuid4())
+        while True:
+            counter = await self.collection.find_one({"_id": self.name}, {"seq": 1})
+            seq = counter["seq"] if counter else 0
+            expires_at = (datetime.now(timezone.utc) + self.ttl).isoformat()
+            try:
+                # Compare-and-set on seq: the reservation's range is only valid if
+                # no other writer advanced the counter since we read it
+                result = await self.collection.update_one(
+                    {"_id": self.name, "seq": seq},
+                    {
+                        "$inc": {"seq": count},
+                        "$push": {"pending": {"token": token, "first": seq + 1, "expires_at": expires_at}},
+                    },
+                    upsert=True,
+                )
+            except DuplicateKeyError:
+                # Lost the race to create or advance the counter
+                continue
+            if result.modified_count or result.upserted_id is not None:
+                return token, seq + 1
+
+    async def watermark(self) -> int:
+        """Highest version at or below which every reserved write has finished."""
+        counter = await self.collection.find_one({"_id": self.name})
+        if not counter:
+            return 0
+        now = datetime.now(timezone.utc).isoformat()
+        pending = counter.get("pending", [])
+        live = [p["first"] for p in pending if p["expires_at"] > now]
+        if len(live) < len(pending):
+            await self.collection.update_one({"_id": self.name}, {"$pull": {"pending": {"expires_at": {"$lte": now}}}})
+        return min(live) - 1 if live else counter["seq"]
+
+
+class Tombstones:
+    """Deletions delta sync clients still have to apply.
+
+    Each tombstone is stamped with a change version like any other write. When
+    a deleted id is written again its tombstone is cleared, so a client never
+    gets the same id as both live and deleted.
+    """
+
+    def __init__(self, collection, versions: ChangeVersions):
+        self.collection = collection
+        self.versions = versions
+
+    async def record(self, kind: str, item_id: str):
+        async with self.versions.reserve() as version:
+            await self.collection.insert_one({
+                "collection": kind,
+                "id": item_id,
+                "change_version": version,
+                "deleted_at": datetime.now(timezone.utc).isoformat(),
+            })
+
+    async def clear(self, kind: str, item_ids: Iterable[str]):
+        """Drop the tombstones of ids that were just written again."""
+        item_ids = list(item_ids)
+        if item_ids:
+            await self.collection.delete_many({"collection": kind, "id": {"$in": item_ids}})
+
+    async def since(self, version: int) -> Dict[str, List[str]]:
+        """Ids deleted after `version`, by collection."""
+        deleted: Dict[str, List[str]] = {"topics": [], "projects": []}
+        if version:
+            async for tombstone in self.collection.find({"change_version": {"$gt": version}}, {"_id": 0}):
+                deleted.setdefault(tombstone["collection"], []).append(tombstone["id"])
+        return deleted
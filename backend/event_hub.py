@@ -0,0 +1,94 @@
+import asyncio
+from typing import Any, AsyncIterator, Dict, Optional, Set
+
+import orjson
+
+
+def format_sse(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {orjson.dumps(data).decode()}\n\n"
+
+
+class Subscription:
+    def __init__(self, user_id: str, maxsize: int):
+        self.user_id = user_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize)
+        self.overflowed = False
+        # The stats this client ends up with once it has read its queue
+        self.stats: Optional[Dict[str, Any]] = None
+
+
+class EventHub:
+    """In-process pub/sub of per-user events for Server-Sent Events streams.
+
+    Each connection gets a bounded queue. A client that falls behind doesn't
+    block publishers: its queued events are dropped and it is told to resync.
+    """
+
+    def __init__(self, queue_size: int = 100, heartbeat: float = 15.0):
+        self.queue_size = queue_size
+        self.heartbeat = heartbeat
+        self._subscribers: Dict[str, Set[Subscription]] = {}
+
+    def has_subscribers(self, user_id: str) -> bool:
+        return bool(self._subscribers.get(user_id))
+
+    def subscribe(self, user_id: str) -> Subscription:
+        """Start queueing the user's events; load the stats snapshot after this."""
+        subscription = Subscription(user_id, self.queue_size)
+        self._subscribers.setdefault(user_id, set()).add(subscription)
+        return subscription
+
+    def set_snapshot(self, subscription: Subscription, stats: Dict[str, Any]):
+        """Record the stats snapshot sent ahead of the queued events.
+
+        If stats were published while the snapshot was loading, the client
+        ends on those instead, so they stay the delta baseline.
+        """
+        if subscription.stats is None:
+            subscription.stats = stats
+
+    def unsubscribe(self, subscription: Subscription):
+        subscribers = self._subscribers.get(subscription.user_id)
+        if subscribers is None:
+            return
+        subscribers.discard(subscription)
+        if not subscribers:
+            del self._subscribers[subscription.user_id]
+
+    def publish(self, user_id: str, event: str, data: Any):
+        for subscription in self._subscribers.get(user_id, ()):
+            self._put(subscription, event, data)
+
+    def publish_stats(self, user_id: str, stats: Dict[str, Any]):
+        """Send each connection only the stats that changed since what it last got.
+
+        A connection still loading its snapshot gets the full stats.
+        """
+        for subscription in self._subscribers.get(user_id, ()):
+            previous = subscription.stats or {}
+            delta = {k: v for k, v in stats.items() if previous.get(k) != v}
+            subscription.stats = stats
+            if delta:
+                self._put(subscription, "stats", delta)
+
+    def _put(self, subscription: Subscription, event: str, data: Any):
+        try:
+            subscription.queue.put_nowait((event, data))
+        except asyncio.QueueFull:
+            subscription.overflowed = True
+
+    async def stream(self, subscription: Subscription) -> AsyncIterator[str]:
+        while True:
+            if subscription.overflowed:
+                while not subscription.queue.empty():
+                    subscription.queue.get_nowait()
+                subscription.overflowed = False
+                yield format_sse("resync", {})
+                continue
+            try:
+                event, data = await asyncio.wait_for(subscription.queue.get(), self.heartbeat)
+            except asyncio.TimeoutError:
+                # Comment lines keep proxies from closing an idle connection
+                yield ": heartbeat\n\n"
+                continue
+            yield format_sse(event, data)
@@ -0,0 +1,92 @@
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+Extractor = Callable[[Dict[str, Any]], Iterable[str]]
+
+
+def _resource_values(key: str, transform=lambda v: v) -> Extractor:
+    return lambda item: [transform(r[key]) for r in item.get("resources", []) if r.get(key)]
+
+
+# Facet name -> values an item contributes to it
+CATALOG_FACETS: Dict[str, Extractor] = {
+    "difficulty": lambda item: [item["difficulty"]] if item.get("difficulty") else [],
+    "career_path": lambda item: item.get("career_paths", []),
+    "skill": lambda item: item.get("skills", []),
+    "duration": lambda item: [d for d in (item.get("duration"), item.get("estimated_time")) if d],
+    "platform": _resource_values("platform"),
+    "pricing": _resource_values("type", str.lower),
+}
+
+
+def iter_bits(bitmap: int) -> Iterator[int]:
+    while bitmap:
+        low = bitmap & -bitmap
+        yield low.bit_length() - 1
+        bitmap ^= low
+
+
+class FacetIndex:
+    """Per-value bitmaps over a fixed list of catalog items.
+
+    Bit i of a bitmap is set when items[i] has that value. Filters OR the
+    selected values within a facet and AND across facets; counts for a facet
+    apply every other facet's filter so multi-select options stay visible.
+    Bitmaps are plain Python ints, so intersections and popcounts run in C.
+    """
+
+    def __init__(self, items: List[Dict[str, Any]], extractors: Dict[str, Extractor] = CATALOG_FACETS):
+        self.items = items
+        self.all_bits = (1 << len(items)) - 1
+        positions: Dict[str, Dict[str, List[int]]] = {facet: {} for facet in extractors}
+        for i, item in enumerate(items):
+            for facet, extract in extractors.items():
+                for value in set(extract(item)):
+                    positions[facet].setdefault(value, []).append(i)
+        self.bitmaps: Dict[str, Dict[str, int]] = {
+            facet: {value: self._to_bitmap(idx) for value, idx in values.items()}
+            for facet, values in positions.items()
+        }
+
+    def _to_bitmap(self, indexes: List[int]) -> int:
+        # Building through a bytearray avoids O(n) big-int copies per set bit
+        buffer = bytearray((len(self.items) + 7) // 8)
+        for i in indexes:
+            buffer[i >> 3] |= 1 << (i & 7)
+        return int.from_bytes(buffer, "little")
+
+    def _mask(self, facet: str, selected: List[str]) -> int:
+        values = self.bitmaps[facet]
+        mask = 0
+        for value in selected:
+            mask |= values.get(value, 0)
+        return mask
+
+    def query(self, filters: Dict[str, Optional[List[str]]]) -> Tuple[int, Dict[str, Dict[str, int]]]:
+        """Return (matching bitmap, per-facet value counts) for multi-select filters."""
+        masks = {facet: self._mask(facet, selected) for facet, selected in filters.items() if selected}
+        result = self.all_bits
+        for mask in masks.values():
+            result &= mask
+
+        counts = {}
+        for facet, values in self.bitmaps.items():
+            base = self.all_bits
+            for other, mask in masks.items():
+                if other != facet:
+                    base &= mask
+            counts[facet] = {
+                value: count for value, count in
+                ((value, (base & bitmap).bit_count()) for value, bitmap in values.items())
+                if count
+            }
+        return result, counts
+
+    def select(self, bitmap: int, offset: int = 0, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        selected = []
+        for n, i in enumerate(iter_bits(bitmap)):
+            if n < offset:
+                continue
+            if limit is not None and len(selected) >= limit:
+                break
+            selected.append(self.items[i])
+        return selected
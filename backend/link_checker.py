@@ -0,0 +1,228 @@
+import asyncio
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, Optional
+from urllib.parse import urlsplit
+
+import requests
+from pymongo import ASCENDING, UpdateOne
+from pymongo.errors import DuplicateKeyError
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+# link_status values surfaced on resources
+LINK_OK = "ok"
+LINK_BROKEN = "broken"
+LINK_UNREACHABLE = "unreachable"
+LINK_UNKNOWN = "unknown"  # the site refused to answer a bot (401/403/429)
+LINK_INVALID = "invalid"  # the URL can't be parsed or requested at all
+LINK_UNCHECKED = "unchecked"
+
+BROKEN_STATUSES = {404, 410}
+REFUSED_STATUSES = {401, 403, 429}
+HEAD_UNSUPPORTED_STATUSES = {400, 403, 405, 501}
+
+
+def classify(http_status: Optional[int]) -> str:
+    if http_status is None:
+        return LINK_UNREACHABLE
+    if http_status < 400:
+        return LINK_OK
+    if http_status in BROKEN_STATUSES:
+        return LINK_BROKEN
+    if http_status in REFUSED_STATUSES:
+        return LINK_UNKNOWN
+    return LINK_UNREACHABLE
+
+
+class LinkChecker:
+    """Checks resource URLs with bounded global and per-host concurrency.
+
+    HTTP calls go through `requests` on a dedicated thread pool, one pooled
+    session per host. Results live in the `link_checks` collection together with
+    the validators (ETag/Last-Modified) used for the next conditional request and
+    the time the link is due to be checked again.
+    """
+
+    def __init__(
+        self,
+        db,
+        concurrency: int = 64,
+        per_host: int = 4,
+        timeout: float = 10.0,
+        ok_interval: timedelta = timedelta(days=7),
+        retry_base: timedelta = timedelta(hours=1),
+        retry_max: timedelta = timedelta(days=1),
+        user_agent: str = "DataPathHub-LinkChecker/1.0",
+        collection: str = "link_checks",
+    ):
+        self.db = db
+        self.collection = db[collection]
+        self.concurrency = concurrency
+        self.per_host = per_host
+        self.timeout = timeout
+        self.ok_interval = ok_interval
+        self.retry_base = retry_base
+        self.retry_max = retry_max
+        self.user_agent = user_agent
+        self._executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="link-check")
+        self._sessions: Dict[str, requests.Session] = {}
+        self._sessions_lock = threading.Lock()
+        self._host_limits: Dict[str, asyncio.Semaphore] = {}
+
+    async def ensure_indexes(self):
+        await self.collection.create_index([("url", ASCENDING)], unique=True)
+        await self.collection.create_index([("next_check_at", ASCENDING)])
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        for session in self._sessions.values():
+            session.close()
+
+    # ===== STATUS LOOKUP =====
+    async def statuses_for(self, urls: Iterable[str]) -> Dict[str, str]:
+        urls = list(set(urls))
+        if not urls:
+            return {}
+        cursor = self.collection.find({"url": {"$in": urls}}, {"_id": 0, "url": 1, "status": 1})
+        return {doc["url"]: doc["status"] async for doc in cursor}
+
+    # ===== CHECKING =====
+    async def check_due(self, urls: Iterable[str], now: Optional[datetime] = None) -> Dict[str, int]:
+        """Check every URL that has never been checked or whose recheck time has passed."""
+        now = now or datetime.now(timezone.utc)
+        urls = sorted(set(u for u in urls if u))
+        previous = {}
+        async for doc in self.collection.find({"url": {"$in": urls}}, {"_id": 0}):
+            previous[doc["url"]] = doc
+        due = [
+            u for u in urls
+            if u not in previous or datetime.fromisoformat(previous[u]["next_check_at"]) <= now
+        ]
+
+        limit = asyncio.Semaphore(self.concurrency)
+
+        async def bounded(url):
+            try:
+                host_limit = self._host_limit(url)
+            except ValueError as e:
+                return self._result(url, previous.get(url), None, LINK_INVALID, str(e))
+            # Wait for the host slot first so busy hosts don't pin global slots
+            async with host_limit, limit:
+                return await self.check_url(url, previous.get(url))
+
+        results = await asyncio.gather(*(bounded(u) for u in due))
+        if results:
+            await self.collection.bulk_write(
+                [UpdateOne({"url": r["url"]}, {"$set": r}, upsert=True) for r in results],
+                ordered=False,
+            )
+
+        summary = {"total": len(urls), "checked": len(results)}
+        for result in results:
+            summary[result["status"]] = summary.get(result["status"], 0) + 1
+        return summary
+
+    async def check_url(self, url: str, previous: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        previous = previous or {}
+        headers = {"User-Agent": self.user_agent}
+        if previous.get("etag"):
+            headers["If-None-Match"] = previous["etag"]
+        if previous.get("last_modified"):
+            headers["If-Modified-Since"] = previous["last_modified"]
+
+        loop = asyncio.get_running_loop()
+        try:
+            response = await loop.run_in_executor(self._executor, self._fetch, url, headers)
+        except ValueError as e:
+            # Malformed URLs surface as requests' InvalidURL or urllib3's LocationParseError
+            return self._result(url, previous, None, LINK_INVALID, str(e))
+        except requests.RequestException as e:
+            return self._result(url, previous, None, LINK_UNREACHABLE, str(e))
+        except Exception as e:
+            # One bad URL must not cost the rest of the batch its results
+            logger.exception("Unexpected error checking %s", url)
+            return self._result(url, previous, None, LINK_UNREACHABLE, str(e))
+        return self._result(url, previous, response.status_code, classify(response.status_code), response=response)
+
+    def _result(
+        self,
+        url: str,
+        previous: Optional[Dict[str, Any]],
+        http_status: Optional[int],
+        status: str,
+        error: Optional[str] = None,
+        response: Optional[requests.Response] = None,
+    ) -> Dict[str, Any]:
+        previous = previous or {}
+        now = datetime.now(timezone.utc)
+        failures = 0 if status == LINK_OK else previous.get("failures", 0) + 1
+        if status == LINK_OK:
+            next_check = now + self.ok_interval
+        else:
+            # Cap the exponent so long-dead links can't overflow timedelta
+            next_check = now + min(self.retry_base * (2 ** min(failures - 1, 30)), self.retry_max)
+
+        result = {
+            "url": url,
+            "status": status,
+            "http_status": http_status,
+            "error": error,
+            "failures": failures,
+            "checked_at": now.isoformat(),
+            "next_check_at": next_check.isoformat(),
+            "etag": previous.get("etag"),
+            "last_modified": previous.get("last_modified"),
+        }
+        if response is not None and http_status != 304:
+            result["etag"] = response.headers.get("ETag")
+            result["last_modified"] = response.headers.get("Last-Modified")
+        return result
+
+    def _fetch(self, url: str, headers: Dict[str, str]) -> requests.Response:
+        session = self._session_for(url)
+        response = session.head(url, headers=headers, timeout=self.timeout, allow_redirects=True)
+        if response.status_code in HEAD_UNSUPPORTED_STATUSES:
+            # Plenty of sites reject HEAD; retry with a GET but don't read the body
+            response = session.get(url, headers=headers, timeout=self.timeout, allow_redirects=True, stream=True)
+            response.close()
+        return response
+
+    def _session_for(self, url: str) -> requests.Session:
+        host = urlsplit(url).netloc.lower()
+        with self._sessions_lock:
+            session = self._sessions.get(host)
+            if session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.per_host)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                self._sessions[host] = session
+        return session
+
+    def _host_limit(self, url: str) -> asyncio.Semaphore:
+        host = urlsplit(url).netloc.lower()
+        if host not in self._host_limits:
+            self._host_limits[host] = asyncio.Semaphore(self.per_host)
+        return self._host_limits[host]
+
+
+async def acquire_lease(db, name: str, holder: str, ttl: timedelta) -> bool:
+    """Take a named lease in `job_locks` so only one worker runs a periodic job."""
+    now = datetime.now(timezone.utc)
+    try:
+        result = await db.job_locks.update_one(
+            {"_id": name, "$or": [{"expires_at": {"$lt": now.isoformat()}}, {"holder": holder}]},
+            {"$set": {"holder": holder, "expires_at": (now + ttl).isoformat()}},
+            upsert=True,
+        )
+    except DuplicateKeyError:
+        return False
+    return result.matched_count > 0 or result.upserted_id is not None
+
+
+async def release_lease(db, name: str, holder: str):
+    await db.job_locks.delete_one({"_id": name, "holder": holder})
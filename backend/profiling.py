@@ -0,0 +1,180 @@
+import hmac
+import logging
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from contextvars import ContextVar
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from pymongo import monitoring
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = "x-debug-profile"
+PROFILE_ID_HEADER = "x-profile-id"
+STREAMING_CONTENT_TYPE = b"text/event-stream"
+
+_current_profile: ContextVar[Optional["RequestProfile"]] = ContextVar("current_profile", default=None)
+
+
+class RequestProfile:
+    def __init__(self, method: str, path: str):
+        self.id = str(uuid.uuid4())
+        self.method = method
+        self.path = path
+        self.started_at = datetime.now(timezone.utc)
+        self.status: Optional[int] = None
+        self.wall_ms = 0.0
+        self.mongo_calls: List[Dict[str, Any]] = []
+        self._pending: Dict[int, Dict[str, Any]] = {}
+        self.stacks: Counter = Counter()
+        self._t0 = time.perf_counter()
+
+    def to_document(self, ttl: timedelta) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "status": self.status,
+            "created_at": self.started_at.isoformat(),
+            "expires_at": self.started_at + ttl,
+            "wall_ms": round(self.wall_ms, 3),
+            "mongo_calls": self.mongo_calls,
+            "mongo_total_ms": round(sum(c["duration_ms"] for c in self.mongo_calls), 3),
+            "samples": sum(self.stacks.values()),
+            "collapsed": "\n".join(f"{stack} {count}" for stack, count in self.stacks.most_common()),
+        }
+
+
+class MongoCommandTimer(monitoring.CommandListener):
+    """Records each Mongo command issued while a profiled request is running.
+
+    Motor runs commands on its executor with a copy of the caller's context,
+    so the profile is picked up through a ContextVar.
+    """
+
+    def started(self, event):
+        profile = _current_profile.get()
+        if profile is not None:
+            collection = event.command.get(event.command_name)
+            profile._pending[event.request_id] = {
+                "command": event.command_name,
+                "collection": collection if isinstance(collection, str) else None,
+                "offset_ms": round((time.perf_counter() - profile._t0) * 1000, 3),
+            }
+
+    def _finish(self, event, ok: bool):
+        profile = _current_profile.get()
+        if profile is not None:
+            call = profile._pending.pop(event.request_id, {"command": event.command_name})
+            call["duration_ms"] = event.duration_micros / 1000
+            call["ok"] = ok
+            profile.mongo_calls.append(call)
+
+    def succeeded(self, event):
+        self._finish(event, True)
+
+    def failed(self, event):
+        self._finish(event, False)
+
+
+class StackSampler:
+    """Samples the event loop thread's Python stack into collapsed-stack counts."""
+
+    def __init__(self, profile: RequestProfile, interval: float):
+        self.profile = profile
+        self.interval = interval
+        self.thread_id = threading.get_ident()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({code.co_filename}:{frame.f_lineno})")
+                frame = frame.f_back
+            if stack:
+                self.profile.stacks[";".join(reversed(stack))] += 1
+
+
+class ProfilingMiddleware:
+    """ASGI middleware that profiles requests carrying a valid X-Debug-Profile token.
+
+    Requests without the header, or under one of `skip_paths`, go straight to
+    the app. Profiled requests are sampled on the event loop thread, so
+    concurrent requests show up in the stacks too; Mongo timings only cover the
+    profiled request. Streaming responses (text/event-stream) never finish, so
+    sampling stops as soon as one starts and no profile is stored.
+    """
+
+    def __init__(
+        self,
+        app,
+        token: str,
+        store,
+        interval: float = 0.001,
+        ttl: timedelta = timedelta(days=1),
+        skip_paths: Tuple[str, ...] = (),
+    ):
+        self.app = app
+        self.token = token.encode()
+        self.store = store
+        self.interval = interval
+        self.ttl = ttl
+        self.skip_paths = skip_paths
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"].startswith(self.skip_paths):
+            return await self.app(scope, receive, send)
+        header = next((v for k, v in scope["headers"] if k == PROFILE_HEADER.encode()), None)
+        if header is None or not hmac.compare_digest(header, self.token):
+            return await self.app(scope, receive, send)
+
+        profile = RequestProfile(scope["method"], scope["path"])
+        sampler = StackSampler(profile, self.interval)
+        streaming = False
+
+        async def send_with_id(message):
+            nonlocal streaming
+            if message["type"] == "http.response.start":
+                profile.status = message["status"]
+                headers = list(message.get("headers", []))
+                content_type = next((v for k, v in headers if k.lower() == b"content-type"), b"")
+                if content_type.startswith(STREAMING_CONTENT_TYPE):
+                    streaming = True
+                    sampler.stop()
+                else:
+                    message = {**message, "headers": headers + [(PROFILE_ID_HEADER.encode(), profile.id.encode())]}
+            await send(message)
+
+        token = _current_profile.set(profile)
+        sampler.start()
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            profile.wall_ms = (time.perf_counter() - profile._t0) * 1000
+            sampler.stop()
+            _current_profile.reset(token)
+            if streaming:
+                return
+            try:
+                await self.store.insert_one(profile.to_document(self.ttl))
+            except Exception:
+                logger.exception("Failed to store profile %s", profile.id)
+
+
+def check_profile_token(header_value: Optional[str], token: Optional[str]) -> bool:
+    return bool(token and header_value and hmac.compare_digest(header_value.encode(), token.encode()))
@@ -0,0 +1,157 @@
+import logging
+import uuid
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from pymongo import ASCENDING, UpdateOne
+
+logger = logging.getLogger(__name__)
+
+# Fields copied onto the embedded `resources` entries of API responses; the
+# catalog models declare resources as Dict[str, str].
+EMBEDDED_FIELDS = ("id", "title", "url", "platform", "type")
+# Fields taken from the embedded dicts when a resource is stored
+SHARED_FIELDS = ("title", "url", "platform", "type")
+DEFAULT_PORTS = {"http": "80", "https": "443"}
+
+
+def normalize_url(url: str) -> str:
+    """Canonical form used to deduplicate resources that point at the same page."""
+    parts = urlsplit(url.strip())
+    scheme = (parts.scheme or "https").lower()
+    host = (parts.hostname or "").lower()
+    if host.startswith("www."):
+        host = host[4:]
+    netloc = host
+    if parts.port and str(parts.port) != DEFAULT_PORTS.get(scheme):
+        netloc = f"{host}:{parts.port}"
+    path = parts.path.rstrip("/")
+    query = urlencode(sorted(
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if not k.lower().startswith("utm_")
+    ))
+    return urlunsplit((scheme, netloc, path, query, ""))
+
+
+def normalize_type(resource_type: Optional[str]) -> str:
+    return (resource_type or "").upper()
+
+
+async def ensure_resource_indexes(db):
+    await db.resources.create_index([("url_key", ASCENDING)], unique=True)
+    await db.resources.create_index([("id", ASCENDING)], unique=True)
+    await db.resources.create_index([("type", ASCENDING), ("platform", ASCENDING)])
+
+
+async def store_resources(
+    db, resource_lists: List[List[Dict[str, Any]]], update_existing: bool = False
+) -> Tuple[List[List[str]], List[str]]:
+    """Upsert embedded resource dicts into `resources` and return their ids.
+
+    Takes one list per catalog item so a whole import batch costs one lookup,
+    one bulk_write and one `$in` query for the ids. Resources are shared by
+    every item that links the same URL, so existing entries keep their title,
+    platform and type unless `update_existing` is set. Returns the ids per
+    item and the ids of existing resources whose fields were changed.
+    """
+    fields_by_key: Dict[str, Dict[str, str]] = {}
+    keyed_lists = []
+    for resources in resource_lists:
+        keys = []
+        for resource in resources:
+            if not resource.get("url", "").strip():
+                raise ValueError("resources need a non-empty url to be stored")
+            key = normalize_url(resource["url"])
+            fields_by_key[key] = {
+                "title": resource.get("title", ""),
+                "url": resource["url"],
+                "platform": resource.get("platform", ""),
+                "type": normalize_type(resource.get("type")),
+            }
+            keys.append(key)
+        keyed_lists.append(keys)
+    if not fields_by_key:
+        return [[] for _ in resource_lists], []
+
+    projection = {"_id": 0, "url_key": 1, "id": 1, **{f: 1 for f in SHARED_FIELDS}}
+    existing = {}
+    async for doc in db.resources.find({"url_key": {"$in": list(fields_by_key)}}, projection):
+        existing[doc["url_key"]] = doc
+    changed = [
+        key for key, doc in existing.items()
+        if update_existing and any(doc.get(f) != fields_by_key[key][f] for f in SHARED_FIELDS)
+    ]
+
+    ops = [
+        UpdateOne(
+            {"url_key": key},
+            {"$setOnInsert": {**fields, "id": str(uuid.uuid4()), "rating": 0.0, "description": "", "tags": []}},
+            upsert=True,
+        )
+        for key, fields in fields_by_key.items() if key not in existing
+    ] + [UpdateOne({"url_key": key}, {"$set": fields_by_key[key]}) for key in changed]
+    if ops:
+        await db.resources.bulk_write(ops, ordered=False)
+
+    ids = {key: doc["id"] for key, doc in existing.items()}
+    missing = [key for key in fields_by_key if key not in ids]
+    if missing:
+        async for doc in db.resources.find({"url_key": {"$in": missing}}, {"_id": 0, "url_key": 1, "id": 1}):
+            ids[doc["url_key"]] = doc["id"]
+    # dict.fromkeys drops duplicates while keeping order
+    id_lists = [list(dict.fromkeys(ids[k] for k in keys)) for keys in keyed_lists]
+    return id_lists, [existing[key]["id"] for key in changed]
+
+
+class ResourceResolver:
+    """Expands `resource_ids` on catalog documents back into embedded resources.
+
+    Create one per request: ids already fetched are served from its cache and
+    the rest are loaded with one batched `$in` query per resolve() call.
+    """
+
+    def __init__(self, db):
+        self.db = db
+        self._cache: Dict[str, Dict[str, str]] = {}
+
+    async def resolve(self, items: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        items = list(items)
+        missing = {
+            rid for item in items for rid in item.get("resource_ids", [])
+            if rid not in self._cache
+        }
+        if missing:
+            projection = {"_id": 0, **{f: 1 for f in EMBEDDED_FIELDS}}
+            async for doc in self.db.resources.find({"id": {"$in": list(missing)}}, projection):
+                self._cache[doc["id"]] = {f: doc.get(f, "") for f in EMBEDDED_FIELDS}
+        for item in items:
+            # Documents written before normalization still embed their resources
+            if "resource_ids" in item:
+                resource_ids = item.pop("resource_ids")
+                item["resources"] = [dict(self._cache[rid]) for rid in resource_ids if rid in self._cache]
+        return items
+
+
+async def normalize_catalog_resources(db) -> Dict[str, int]:
+    """Move embedded `resources` arrays of topics and projects into the resources collection."""
+    migrated = {}
+    for collection in ("topics", "projects"):
+        docs = await db[collection].find(
+            {"resources": {"$exists": True}}, {"_id": 0, "id": 1, "resources": 1}
+        ).to_list(None)
+        # Entries without a URL can't be keyed, so those items keep their embedded resources
+        unkeyed = {d["id"] for d in docs if any(not r.get("url", "").strip() for r in d.get("resources", []))}
+        if unkeyed:
+            logger.warning("Leaving resources embedded in %d %s with URL-less entries: %s",
+                           len(unkeyed), collection, ", ".join(sorted(unkeyed)[:20]))
+            docs = [d for d in docs if d["id"] not in unkeyed]
+        if not docs:
+            migrated[collection] = 0
+            continue
+        id_lists, _ = await store_resources(db, [d.get("resources", []) for d in docs])
+        await db[collection].bulk_write([
+            UpdateOne({"id": doc["id"]}, {"$set": {"resource_ids": ids}, "$unset": {"resources": ""}})
+            for doc, ids in zip(docs, id_lists)
+        ], ordered=False)
+        migrated[collection] = len(docs)
+    return migrated
@@ -3,6 +3,7 @@ from motor.motor_asyncio import AsyncIOMotorClient
 import os
 from dotenv import load_dotenv
 import uuid
+from resource_store import ensure_resource_indexes, normalize_catalog_resources
 
 load_dotenv()
 
@@ -472,6 +473,13 @@ async def seed_database():
         result = await db.projects.insert_many(PROJECTS_DATA)
         print(f"Inserted {len(result.inserted_ids)} projects")
     
+    # Deduplicate embedded resources into the resources collection
+    await ensure_resource_indexes(db)
+    migrated = await normalize_catalog_resources(db)
+    print(f"Linked resources for {migrated['topics']} topics and {migrated['projects']} projects")
+    resource_count = await db.resources.count_documents({})
+    print(f"Unique resources: {resource_count}")
+    
     print("Database seeding completed!")
     print(f"\nTotal Topics: {len(TOPICS_DATA)}")
     print(f"Total Projects: {len(PROJECTS_DATA)}")
@@ -1,26 +1,95 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Request, Response, Depends
+from fastapi import FastAPI, APIRouter, HTTPException, Request, Response, Depends, Query
+from fastapi.responses import ORJSONResponse, PlainTextResponse, StreamingResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ASCENDING, ReplaceOne
+from pymongo.errors import BulkWriteError
+from pymongo.read_preferences import SecondaryPreferred
+import asyncio
+import csv
+from collections import deque
+import json
+import orjson
 import os
 import logging
 from pathlib import Path
-from pydantic import BaseModel, Field, ConfigDict
-from typing import List, Optional, Dict, Any
+from pydantic import BaseModel, Field, ConfigDict, TypeAdapter, create_model, field_validator
+from typing import List, Optional, Dict, Any, AsyncIterator, get_origin
 import uuid
 from datetime import datetime, timezone, timedelta
+from functools import lru_cache
 import requests
 import firebase_admin
 from firebase_admin import credentials, auth as firebase_auth
+from cache_bus import DocumentCache, InvalidationBus
+from catalog_index import CatalogIndexes
+from change_versions import ChangeVersions, Tombstones
+from event_hub import EventHub, format_sse
+from facets import FacetIndex
+from autocomplete import build_autocomplete, normalize_prefix
+from link_checker import LinkChecker, LINK_UNCHECKED, acquire_lease, release_lease
+from singleflight import SingleFlight
+from similarity import RelatedItems
+from profiling import MongoCommandTimer, ProfilingMiddleware, PROFILE_HEADER, check_profile_token
+from resource_store import (
+    ResourceResolver, ensure_resource_indexes, normalize_catalog_resources, normalize_type, store_resources
+)
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
 # MongoDB connection
+MONGO_POOL_OPTIONS = {
+    'MONGO_MAX_POOL_SIZE': 'maxPoolSize',
+    'MONGO_MIN_POOL_SIZE': 'minPoolSize',
+    'MONGO_MAX_IDLE_TIME_MS': 'maxIdleTimeMS',
+    'MONGO_WAIT_QUEUE_TIMEOUT_MS': 'waitQueueTimeoutMS',
+    'MONGO_SERVER_SELECTION_TIMEOUT_MS': 'serverSelectionTimeoutMS',
+    'MONGO_CONNECT_TIMEOUT_MS': 'connectTimeoutMS',
+    'MONGO_SOCKET_TIMEOUT_MS': 'socketTimeoutMS',
+}
+# Per-request profiling is only wired in when a token is configured
+DEBUG_PROFILE_TOKEN = os.environ.get('DEBUG_PROFILE_TOKEN')
+
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
+client = AsyncIOMotorClient(
+    mongo_url,
+    event_listeners=[MongoCommandTimer()] if DEBUG_PROFILE_TOKEN else [],
+    **{option: int(os.environ[env]) for env, option in MONGO_POOL_OPTIONS.items() if os.environ.get(env)}
+)
 db = client[os.environ['DB_NAME']]
 
+# Catalog, search and stats reads may go to secondaries. Secondaries lagging
+# more than the staleness bound are skipped and the driver falls back to the
+# primary when none qualify. Auth, sessions and progress writes use `db`.
+if os.environ.get('MONGO_READ_FROM_SECONDARIES', 'false').lower() == 'true':
+    read_db = client.get_database(
+        os.environ['DB_NAME'],
+        read_preference=SecondaryPreferred(
+            max_staleness=int(os.environ.get('MONGO_MAX_STALENESS_SECONDS', '90'))
+        )
+    )
+else:
+    read_db = db
+
+# Cross-worker cache invalidation (needs a replica set for change streams)
+invalidation_bus = InvalidationBus(db)
+invalidation_bus.watch_collection("resources")
+session_cache = DocumentCache(invalidation_bus, ("sessions", "users"))
+
+# Live progress/stats pushes for /api/events connections on this worker
+event_hub = EventHub(
+    queue_size=int(os.environ.get('EVENTS_QUEUE_SIZE', '100')),
+    heartbeat=float(os.environ.get('EVENTS_HEARTBEAT_SECONDS', '15'))
+)
+
+link_checker = LinkChecker(
+    db,
+    concurrency=int(os.environ.get('LINK_CHECK_CONCURRENCY', '64')),
+    per_host=int(os.environ.get('LINK_CHECK_PER_HOST', '4'))
+)
+
 # Create the main app
 app = FastAPI()
 api_router = APIRouter(prefix="/api")
@@ -63,6 +132,13 @@ class Topic(BaseModel):
     resources: List[Dict[str, str]] = []  # [{title, url, platform, type}]
     order: int = 0
 
+def require_resource_urls(resources: List[Dict[str, str]]) -> List[Dict[str, str]]:
+    # Resources are stored once per URL, so an entry without one has nowhere to go
+    for resource in resources:
+        if not resource.get('url', '').strip():
+            raise ValueError("every resource needs a non-empty url")
+    return resources
+
 class TopicCreate(BaseModel):
     title: str
     description: str
@@ -72,6 +148,8 @@ class TopicCreate(BaseModel):
     career_paths: List[str] = []
     resources: List[Dict[str, str]] = []
     order: int = 0
+    
+    _resource_urls = field_validator('resources')(require_resource_urls)
 
 class Project(BaseModel):
     model_config = ConfigDict(extra="ignore")
@@ -94,6 +172,8 @@ class ProjectCreate(BaseModel):
     github_link: Optional[str] = None
     estimated_time: str = "2-4 weeks"
     career_paths: List[str] = []
+    
+    _resource_urls = field_validator('resources')(require_resource_urls)
 
 class UserProgress(BaseModel):
     model_config = ConfigDict(extra="ignore")
@@ -126,8 +206,107 @@ class Resource(BaseModel):
     description: str = ""
     tags: List[str] = []
 
+# ===== RESPONSE FAST PATH =====
+# Documents read from our own collections were validated when they were
+# written, so read routes hand them straight to orjson. (A single small model
+# such as User is cheaper to validate than to model_construct, so sessions cache
+# the validated User instead.) Those routes declare
+# response_class=ORJSONResponse instead of a response_model, which they would
+# bypass anyway. With no model to drop unknown keys, internal bookkeeping
+# fields are projected out when the documents are read.
+# Request bodies are still validated by their *Create/*Update models.
+PUBLIC_PROJECTION = {"_id": 0, "change_version": 0}
+
+# ===== REQUEST COALESCING =====
+# Identical concurrent reads share one query and one serialized body. Keys carry
+# the catalog version so a read that starts after a write never joins a flight
+# that began before it. Each caller gets its own Response: middleware mutates
+# response headers in place, so Response objects must not be shared.
+read_flight = SingleFlight()
+
+async def coalesced_json(key: tuple, produce) -> Response:
+    catalog_version = invalidation_bus.version_of(("topics", "projects", "resources"))
+    body = await read_flight.do(key + (catalog_version,), produce)
+    return Response(content=body, media_type="application/json")
+
+# ===== SPARSE FIELDSETS =====
+SUMMARY_FIELDS = {
+    Topic: ("id", "title", "difficulty", "duration", "career_paths", "order"),
+    Project: ("id", "title", "difficulty", "estimated_time", "career_paths", "skills"),
+}
+
+def parse_fieldset(model, fields: Optional[str], view: Optional[str]) -> Optional[tuple]:
+    """Resolve `fields=`/`view=` into an ordered tuple of field names, or None for the full model."""
+    if view not in (None, "full", "summary"):
+        raise HTTPException(status_code=400, detail=f"Unknown view: {view}")
+    if fields:
+        requested = {f.strip() for f in fields.split(',') if f.strip()}
+        unknown = requested - set(model.model_fields)
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(sorted(unknown))}")
+    elif view == "summary":
+        requested = set(SUMMARY_FIELDS[model])
+    else:
+        return None
+    requested.add("id")
+    return tuple(f for f in model.model_fields if f in requested)
+
+@lru_cache(maxsize=256)
+def slim_list_adapter(model, fieldset: tuple) -> TypeAdapter:
+    slim = create_model(
+        f"{model.__name__}Slim",
+        __config__=ConfigDict(extra="ignore"),
+        **{f: (model.model_fields[f].annotation, model.model_fields[f]) for f in fieldset}
+    )
+    return TypeAdapter(List[slim])
+
+def slim_projection(fieldset: tuple) -> Dict[str, int]:
+    projection = {f: 1 for f in fieldset}
+    if "resources" in fieldset:
+        projection["resource_ids"] = 1
+    projection["_id"] = 0
+    return projection
+
+def slim_json(model, fieldset: tuple, docs: List[dict]) -> bytes:
+    adapter = slim_list_adapter(model, fieldset)
+    return adapter.dump_json(adapter.validate_python(docs))
+
+# ===== NORMALIZED RESOURCES =====
+async def to_catalog_docs(items: List[BaseModel], update_shared: bool = False) -> List[dict]:
+    """Dump catalog models for storage, replacing embedded resources with references.
+
+    Resources are shared between items, so the fields of existing ones are only
+    overwritten with `update_shared` (bulk imports).
+    """
+    docs = [item.model_dump() for item in items]
+    id_lists, changed_ids = await store_resources(
+        db, [doc.pop('resources', []) for doc in docs], update_existing=update_shared
+    )
+    for doc, resource_ids in zip(docs, id_lists):
+        doc['resource_ids'] = resource_ids
+    if changed_ids:
+        await touch_resource_referrers(changed_ids)
+    if any(id_lists):
+        await invalidation_bus.publish("resources", "update")
+    return docs
+
+async def touch_resource_referrers(resource_ids: List[str]):
+    # Items embed resources in responses, so sync clients must refetch every item that links a changed one
+    async with change_versions.reserve() as version:
+        for collection in ("topics", "projects"):
+            await db[collection].update_many(
+                {"resource_ids": {"$in": resource_ids}},
+                {"$set": {"change_version": version}}
+            )
+
+# ===== CHANGE VERSIONS =====
+# Every write that sync clients must see is stamped while its versions are
+# reserved, so /sync never hands out a version whose write isn't visible yet
+change_versions = ChangeVersions(db.counters)
+tombstones = Tombstones(db.tombstones, change_versions)
+
 # ===== AUTH HELPER =====
-async def get_current_user(request: Request) -> Optional[User]:
+def get_session_token(request: Request) -> Optional[str]:
     # Check session token from cookie
     session_token = request.cookies.get('session_token')
     
@@ -137,26 +316,64 @@ async def get_current_user(request: Request) -> Optional[User]:
         if auth_header.startswith('Bearer '):
             session_token = auth_header[7:]
     
-    if not session_token:
-        return None
-    
+    return session_token or None
+
+def get_cached_session_user(session_token: str) -> Optional[User]:
+    cached = session_cache.get(session_token)
+    if cached:
+        user, expires_at = cached
+        if expires_at >= datetime.now(timezone.utc):
+            return user
+    return None
+
+def cache_session_user(session_token: str, session: Dict[str, Any], user_doc: Dict[str, Any], generation: int) -> User:
+    """Build the session's User and cache it under the token, tagged with both documents' ids."""
+    user_object_id = user_doc.pop('_id', None)
+    # Cache hits hand out this instance, so authenticated requests skip building a User
+    user = User(**user_doc)
+    tags = [
+        ("sessions", session.get('id')),
+        ("sessions", str(session['_id'])),
+        ("users", user_doc.get('id')),
+        ("users", str(user_object_id) if user_object_id is not None else None)
+    ]
+    expires_at = datetime.fromisoformat(session['expires_at'])
+    session_cache.set(session_token, (user, expires_at), [t for t in tags if t[1]], generation)
+    return user
+
+async def find_active_session(session_token: str) -> Optional[Dict[str, Any]]:
     # Find session in database
     session = await db.sessions.find_one({"session_token": session_token})
     if not session:
         return None
     
     # Check if session expired
-    expires_at = datetime.fromisoformat(session['expires_at'])
-    if expires_at < datetime.now(timezone.utc):
+    if datetime.fromisoformat(session['expires_at']) < datetime.now(timezone.utc):
         await db.sessions.delete_one({"_id": session['_id']})
+        await invalidation_bus.publish("sessions", "delete", session.get('id'), str(session['_id']))
+        return None
+    return session
+
+async def get_current_user(request: Request) -> Optional[User]:
+    session_token = get_session_token(request)
+    if not session_token:
+        return None
+    
+    user = get_cached_session_user(session_token)
+    if user:
+        return user
+    generation = session_cache.generation
+    
+    session = await find_active_session(session_token)
+    if not session:
         return None
     
     # Get user
-    user_data = await db.users.find_one({"id": session['user_id']}, {"_id": 0})
+    user_data = await db.users.find_one({"id": session['user_id']})
     if not user_data:
         return None
     
-    return User(**user_data)
+    return cache_session_user(session_token, session, user_data, generation)
 
 # ===== ROUTES =====
 @api_router.get("/")
@@ -193,6 +410,7 @@ async def get_emergent_session(request: Request, response: Response):
             auth_provider='emergent'
         )
         await db.users.insert_one(user.model_dump())
+        await invalidation_bus.publish("users", "insert", user.id)
     else:
         user = User(**existing_user)
     
@@ -245,6 +463,7 @@ async def verify_firebase_token(request: Request, response: Response):
                 auth_provider='firebase'
             )
             await db.users.insert_one(user.model_dump())
+            await invalidation_bus.publish("users", "insert", user.id)
         else:
             user = User(**existing_user)
         
@@ -274,65 +493,106 @@ async def verify_firebase_token(request: Request, response: Response):
     except Exception as e:
         raise HTTPException(status_code=401, detail=f"Invalid token: {str(e)}")
 
-@api_router.get("/auth/me")
+@api_router.get("/auth/me", response_class=ORJSONResponse, responses={200: {"model": User}})
 async def get_current_user_endpoint(request: Request):
     user = await get_current_user(request)
     if not user:
         raise HTTPException(status_code=401, detail="Not authenticated")
-    return user
+    return ORJSONResponse(user.model_dump())
 
 @api_router.post("/auth/logout")
 async def logout(request: Request, response: Response):
     session_token = request.cookies.get('session_token')
     if session_token:
-        await db.sessions.delete_one({"session_token": session_token})
+        session = await db.sessions.find_one_and_delete({"session_token": session_token})
+        if session:
+            await invalidation_bus.publish("sessions", "delete", session.get('id'), str(session['_id']))
     response.delete_cookie("session_token")
     return {"message": "Logged out successfully"}
 
 # ===== TOPICS =====
-@api_router.get("/topics", response_model=List[Topic])
-async def get_topics(difficulty: Optional[str] = None, career_path: Optional[str] = None):
+@api_router.get(
+    "/topics",
+    response_class=ORJSONResponse,
+    responses={200: {"description": "Topics; with `fields=` or `view=summary` only the selected fields of each"}}
+)
+async def get_topics(
+    difficulty: Optional[str] = None,
+    career_path: Optional[str] = None,
+    fields: Optional[str] = None,
+    view: Optional[str] = None
+):
+    fieldset = parse_fieldset(Topic, fields, view)
     query = {}
     if difficulty:
         query['difficulty'] = difficulty
     if career_path:
         query['career_paths'] = career_path
     
-    topics = await db.topics.find(query, {"_id": 0}).sort("order", 1).to_list(1000)
-    return topics
+    async def produce():
+        projection = slim_projection(fieldset) if fieldset else PUBLIC_PROJECTION
+        topics = await read_db.topics.find(query, projection).sort("order", 1).to_list(1000)
+        if fieldset:
+            if "resources" in fieldset:
+                await ResourceResolver(read_db).resolve(topics)
+            return slim_json(Topic, fieldset, topics)
+        return orjson.dumps(await ResourceResolver(read_db).resolve(topics))
+    
+    return await coalesced_json(("topics", difficulty, career_path, fieldset), produce)
 
-@api_router.get("/topics/{topic_id}", response_model=Topic)
+@api_router.get("/topics/{topic_id}", response_class=ORJSONResponse, responses={200: {"model": Topic}})
 async def get_topic(topic_id: str):
-    topic = await db.topics.find_one({"id": topic_id}, {"_id": 0})
-    if not topic:
-        raise HTTPException(status_code=404, detail="Topic not found")
-    return topic
+    async def produce():
+        topic = await read_db.topics.find_one({"id": topic_id}, PUBLIC_PROJECTION)
+        if not topic:
+            raise HTTPException(status_code=404, detail="Topic not found")
+        await ResourceResolver(read_db).resolve([topic])
+        await annotate_link_status([topic])
+        return orjson.dumps(topic)
+    
+    return await coalesced_json(("topic", topic_id), produce)
 
-@api_router.post("/topics", response_model=Topic)
+@api_router.post("/topics", response_class=ORJSONResponse, responses={200: {"model": Topic}})
 async def create_topic(topic: TopicCreate, request: Request):
     user = await get_current_user(request)
     if not user:
         raise HTTPException(status_code=401, detail="Not authenticated")
     
     new_topic = Topic(**topic.model_dump())
-    await db.topics.insert_one(new_topic.model_dump())
-    return new_topic
+    doc, = await to_catalog_docs([new_topic])
+    async with change_versions.reserve() as version:
+        doc['change_version'] = version
+        await db.topics.insert_one(doc)
+    await invalidation_bus.publish("topics", "insert", new_topic.id)
+    
+    # Resources may have been matched to stored entries, so answer with what a GET would return
+    created_topic = await db.topics.find_one({"id": new_topic.id}, PUBLIC_PROJECTION)
+    await ResourceResolver(db).resolve([created_topic])
+    return ORJSONResponse(created_topic)
 
-@api_router.put("/topics/{topic_id}", response_model=Topic)
+@api_router.put("/topics/{topic_id}", response_class=ORJSONResponse, responses={200: {"model": Topic}})
 async def update_topic(topic_id: str, topic: TopicCreate, request: Request):
     user = await get_current_user(request)
     if not user:
         raise HTTPException(status_code=401, detail="Not authenticated")
+    # Check first so a missing topic doesn't leave new resources behind
+    if not await db.topics.find_one({"id": topic_id}, {"_id": 1}):
+        raise HTTPException(status_code=404, detail="Topic not found")
     
-    result = await db.topics.update_one(
-        {"id": topic_id},
-        {"$set": topic.model_dump()}
-    )
+    doc, = await to_catalog_docs([topic])
+    async with change_versions.reserve() as version:
+        doc['change_version'] = version
+        result = await db.topics.update_one(
+            {"id": topic_id},
+            {"$set": doc, "$unset": {"resources": ""}}
+        )
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Topic not found")
+    await invalidation_bus.publish("topics", "update", topic_id)
     
-    updated_topic = await db.topics.find_one({"id": topic_id}, {"_id": 0})
-    return Topic(**updated_topic)
+    updated_topic = await db.topics.find_one({"id": topic_id}, PUBLIC_PROJECTION)
+    await ResourceResolver(db).resolve([updated_topic])
+    return ORJSONResponse(updated_topic)
 
 @api_router.delete("/topics/{topic_id}")
 async def delete_topic(topic_id: str, request: Request):
@@ -343,64 +603,105 @@ async def delete_topic(topic_id: str, request: Request):
     result = await db.topics.delete_one({"id": topic_id})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Topic not found")
+    await tombstones.record("topics", topic_id)
+    await invalidation_bus.publish("topics", "delete", topic_id)
     return {"message": "Topic deleted"}
 
 # ===== PROJECTS =====
-@api_router.get("/projects", response_model=List[Project])
-async def get_projects(difficulty: Optional[str] = None, career_path: Optional[str] = None):
+@api_router.get(
+    "/projects",
+    response_class=ORJSONResponse,
+    responses={200: {"description": "Projects; with `fields=` or `view=summary` only the selected fields of each"}}
+)
+async def get_projects(
+    difficulty: Optional[str] = None,
+    career_path: Optional[str] = None,
+    fields: Optional[str] = None,
+    view: Optional[str] = None
+):
+    fieldset = parse_fieldset(Project, fields, view)
     query = {}
     if difficulty:
         query['difficulty'] = difficulty
     if career_path:
         query['career_paths'] = career_path
     
-    projects = await db.projects.find(query, {"_id": 0}).to_list(1000)
-    return projects
+    async def produce():
+        projection = slim_projection(fieldset) if fieldset else PUBLIC_PROJECTION
+        projects = await read_db.projects.find(query, projection).to_list(1000)
+        if fieldset:
+            if "resources" in fieldset:
+                await ResourceResolver(read_db).resolve(projects)
+            return slim_json(Project, fieldset, projects)
+        return orjson.dumps(await ResourceResolver(read_db).resolve(projects))
+    
+    return await coalesced_json(("projects", difficulty, career_path, fieldset), produce)
 
-@api_router.get("/projects/{project_id}", response_model=Project)
+@api_router.get("/projects/{project_id}", response_class=ORJSONResponse, responses={200: {"model": Project}})
 async def get_project(project_id: str):
-    project = await db.projects.find_one({"id": project_id}, {"_id": 0})
-    if not project:
-        raise HTTPException(status_code=404, detail="Project not found")
-    return project
+    async def produce():
+        project = await read_db.projects.find_one({"id": project_id}, PUBLIC_PROJECTION)
+        if not project:
+            raise HTTPException(status_code=404, detail="Project not found")
+        await ResourceResolver(read_db).resolve([project])
+        await annotate_link_status([project])
+        return orjson.dumps(project)
+    
+    return await coalesced_json(("project", project_id), produce)
 
-@api_router.post("/projects", response_model=Project)
+@api_router.post("/projects", response_class=ORJSONResponse, responses={200: {"model": Project}})
 async def create_project(project: ProjectCreate, request: Request):
     user = await get_current_user(request)
     if not user:
         raise HTTPException(status_code=401, detail="Not authenticated")
     
     new_project = Project(**project.model_dump())
-    await db.projects.insert_one(new_project.model_dump())
-    return new_project
+    doc, = await to_catalog_docs([new_project])
+    async with change_versions.reserve() as version:
+        doc['change_version'] = version
+        await db.projects.insert_one(doc)
+    await invalidation_bus.publish("projects", "insert", new_project.id)
+    
+    # Resources may have been matched to stored entries, so answer with what a GET would return
+    created_project = await db.projects.find_one({"id": new_project.id}, PUBLIC_PROJECTION)
+    await ResourceResolver(db).resolve([created_project])
+    return ORJSONResponse(created_project)
 
-@api_router.put("/projects/{project_id}", response_model=Project)
+@api_router.put("/projects/{project_id}", response_class=ORJSONResponse, responses={200: {"model": Project}})
 async def update_project(project_id: str, project: ProjectCreate, request: Request):
     user = await get_current_user(request)
     if not user:
         raise HTTPException(status_code=401, detail="Not authenticated")
+    # Check first so a missing project doesn't leave new resources behind
+    if not await db.projects.find_one({"id": project_id}, {"_id": 1}):
+        raise HTTPException(status_code=404, detail="Project not found")
     
-    result = await db.projects.update_one(
-        {"id": project_id},
-        {"$set": project.model_dump()}
-    )
+    doc, = await to_catalog_docs([project])
+    async with change_versions.reserve() as version:
+        doc['change_version'] = version
+        result = await db.projects.update_one(
+            {"id": project_id},
+            {"$set": doc, "$unset": {"resources": ""}}
+        )
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Project not found")
+    await invalidation_bus.publish("projects", "update", project_id)
     
-    updated_project = await db.projects.find_one({"id": project_id}, {"_id": 0})
-    return Project(**updated_project)
+    updated_project = await db.projects.find_one({"id": project_id}, PUBLIC_PROJECTION)
+    await ResourceResolver(db).resolve([updated_project])
+    return ORJSONResponse(updated_project)
 
 # ===== USER PROGRESS =====
-@api_router.get("/progress")
+@api_router.get("/progress", response_class=ORJSONResponse, responses={200: {"model": List[UserProgress]}})
 async def get_user_progress(request: Request):
     user = await get_current_user(request)
     if not user:
         raise HTTPException(status_code=401, detail="Not authenticated")
     
-    progress = await db.progress.find({"user_id": user.id}, {"_id": 0}).to_list(1000)
-    return progress
+    progress = await db.progress.find({"user_id": user.id}, PUBLIC_PROJECTION).to_list(1000)
+    return ORJSONResponse(progress)
 
-@api_router.post("/progress")
+@api_router.post("/progress", response_model=UserProgress)
 async def update_progress(progress_data: ProgressUpdate, request: Request):
     user = await get_current_user(request)
     if not user:
@@ -427,11 +728,14 @@ async def update_progress(progress_data: ProgressUpdate, request: Request):
         elif progress_data.status == "in_progress" and not existing.get('started_at'):
             update_data['started_at'] = now
         
-        await db.progress.update_one(
-            {"id": existing['id']},
-            {"$set": update_data}
-        )
-        updated = await db.progress.find_one({"id": existing['id']}, {"_id": 0})
+        async with change_versions.reserve() as version:
+            update_data['change_version'] = version
+            await db.progress.update_one(
+                {"id": existing['id']},
+                {"$set": update_data}
+            )
+        updated = await db.progress.find_one({"id": existing['id']}, PUBLIC_PROJECTION)
+        await publish_progress_event(user.id, updated)
         return updated
     else:
         new_progress = UserProgress(
@@ -444,7 +748,12 @@ async def update_progress(progress_data: ProgressUpdate, request: Request):
             started_at=now if progress_data.status != "not_started" else None,
             completed_at=now if progress_data.status == "completed" else None
         )
-        await db.progress.insert_one(new_progress.model_dump())
+        async with change_versions.reserve() as version:
+            await db.progress.insert_one({
+                **new_progress.model_dump(),
+                "change_version": version
+            })
+        await publish_progress_event(user.id, new_progress.model_dump())
         return new_progress.model_dump()
 
 @api_router.get("/stats")
@@ -453,11 +762,11 @@ async def get_user_stats(request: Request):
     if not user:
         raise HTTPException(status_code=401, detail="Not authenticated")
     
-    progress = await db.progress.find({"user_id": user.id}, {"_id": 0}).to_list(1000)
-    
-    total_topics = await db.topics.count_documents({})
-    total_projects = await db.projects.count_documents({})
-    
+    # Progress is read-after-write data and comes from the primary; only the
+    # catalog counts may be served by a secondary
+    return await load_user_stats(user.id)
+
+def compute_user_stats(progress: List[dict], total_topics: int, total_projects: int) -> Dict[str, int]:
     completed_topics = len([p for p in progress if p['item_type'] == 'topic' and p['status'] == 'completed'])
     completed_projects = len([p for p in progress if p['item_type'] == 'project' and p['status'] == 'completed'])
     in_progress_topics = len([p for p in progress if p['item_type'] == 'topic' and p['status'] == 'in_progress'])
@@ -474,32 +783,663 @@ async def get_user_stats(request: Request):
         "total_in_progress": in_progress_topics + in_progress_projects
     }
 
+async def load_user_stats(user_id: str) -> Dict[str, int]:
+    progress, total_topics, total_projects = await asyncio.gather(
+        db.progress.find({"user_id": user_id}, {"_id": 0, "item_type": 1, "status": 1}).to_list(None),
+        read_db.topics.count_documents({}),
+        read_db.projects.count_documents({})
+    )
+    return compute_user_stats(progress, total_topics, total_projects)
+
+# ===== LIVE EVENTS =====
+async def publish_progress_event(user_id: str, progress_row: dict):
+    # Only pay for recomputing stats when someone is listening
+    if not event_hub.has_subscribers(user_id):
+        return
+    event_hub.publish(user_id, "progress", progress_row)
+    event_hub.publish_stats(user_id, await load_user_stats(user_id))
+
+@api_router.get("/events")
+async def stream_events(request: Request):
+    user = await get_current_user(request)
+    if not user:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    
+    async def event_stream():
+        # Subscribe once streaming starts so an abandoned response can't leak a queue,
+        # and before loading the snapshot so writes in between are queued, not lost
+        subscription = event_hub.subscribe(user.id)
+        try:
+            stats = await load_user_stats(user.id)
+            event_hub.set_snapshot(subscription, stats)
+            yield format_sse("stats", stats)
+            async for message in event_hub.stream(subscription):
+                if await request.is_disconnected():
+                    break
+                yield message
+        finally:
+            event_hub.unsubscribe(subscription)
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+# ===== DASHBOARD =====
+RECENT_TOPICS_LIMIT = 3
+
+@api_router.get("/dashboard", response_class=ORJSONResponse)
+async def get_dashboard(request: Request):
+    session_token = get_session_token(request)
+    if not session_token:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    
+    # Authenticate once; everything below only needs the user id
+    user = get_cached_session_user(session_token)
+    generation = session_cache.generation
+    session = None
+    if user:
+        user_id = user.id
+        user_future = asyncio.get_running_loop().create_future()
+        user_future.set_result(user.model_dump())
+    else:
+        session = await find_active_session(session_token)
+        if not session:
+            raise HTTPException(status_code=401, detail="Not authenticated")
+        user_id = session['user_id']
+        user_future = asyncio.ensure_future(db.users.find_one({"id": user_id}))
+    
+    progress_future = asyncio.ensure_future(
+        db.progress.find({"user_id": user_id}, PUBLIC_PROJECTION).to_list(1000)
+    )
+    
+    async def fetch_enrolled_topics():
+        user_doc = await user_future
+        enrolled_paths = (user_doc or {}).get('enrolled_paths') or []
+        if not enrolled_paths:
+            return []
+        return await read_db.topics.find(
+            {"career_paths": {"$in": enrolled_paths}},
+            slim_projection(SUMMARY_FIELDS[Topic])
+        ).sort("order", 1).to_list(1000)
+    
+    async def fetch_recent_topics():
+        progress = await progress_future
+        in_progress = [
+            p for p in progress if p['item_type'] == 'topic' and p['status'] == 'in_progress'
+        ][:RECENT_TOPICS_LIMIT]
+        if not in_progress:
+            return []
+        topics = await read_db.topics.find(
+            {"id": {"$in": [p['item_id'] for p in in_progress]}}, PUBLIC_PROJECTION
+        ).to_list(RECENT_TOPICS_LIMIT)
+        await ResourceResolver(read_db).resolve(topics)
+        topics_by_id = {t['id']: t for t in topics}
+        return [
+            {**topics_by_id[p['item_id']], "progress": p['progress_percentage']}
+            for p in in_progress if p['item_id'] in topics_by_id
+        ]
+    
+    try:
+        user_data, progress, total_topics, total_projects, enrolled_topics, recent_topics = await asyncio.gather(
+            user_future,
+            progress_future,
+            read_db.topics.count_documents({}),
+            read_db.projects.count_documents({}),
+            fetch_enrolled_topics(),
+            fetch_recent_topics()
+        )
+    finally:
+        # Don't leave the shared futures running if a sibling query failed
+        user_future.cancel()
+        progress_future.cancel()
+    if not user_data:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    if session:
+        user_data = cache_session_user(session_token, session, user_data, generation).model_dump()
+    
+    return ORJSONResponse({
+        "user": user_data,
+        "progress": progress,
+        "stats": compute_user_stats(progress, total_topics, total_projects),
+        "enrolled_topics": enrolled_topics,
+        "recent_topics": recent_topics
+    })
+
+# ===== BULK IMPORT / EXPORT =====
+CATALOG_MODELS = {
+    "topics": (TopicCreate, Topic),
+    "projects": (ProjectCreate, Project),
+}
+IMPORT_BATCH_SIZE = 1000
+IMPORT_MAX_ERRORS = 1000
+EXPORT_BATCH_SIZE = 1000
+
+def get_catalog_models(collection: str):
+    if collection not in CATALOG_MODELS:
+        raise HTTPException(status_code=404, detail=f"Unknown collection: {collection}")
+    return CATALOG_MODELS[collection]
+
+async def iter_body_lines(request: Request) -> AsyncIterator[bytes]:
+    # Split the body into lines as it arrives instead of buffering it whole;
+    # decoding is left to the caller so a bad byte only fails its own line
+    pending = b""
+    async for chunk in request.stream():
+        pending += chunk
+        *lines, pending = pending.split(b"\n")
+        for line in lines:
+            yield line.rstrip(b"\r")
+    if pending:
+        yield pending.rstrip(b"\r")
+
+class LineFeed:
+    """Iterator a single csv.reader pulls from while lines are pushed in as the body streams.
+
+    The reader is only advanced once a whole record has been pushed, so quoted
+    fields may span lines.
+    """
+    
+    def __init__(self):
+        self.lines = deque()
+    
+    def push(self, line: str):
+        self.lines.append(line + "\n")
+    
+    def clear(self):
+        self.lines.clear()
+    
+    def __iter__(self):
+        return self
+    
+    def __next__(self) -> str:
+        if not self.lines:
+            raise StopIteration
+        return self.lines.popleft()
+
+def parse_csv_row(header: List[str], values: List[str], create_model) -> Dict[str, Any]:
+    if len(values) != len(header):
+        raise ValueError(f"expected {len(header)} columns, got {len(values)}")
+    row = {}
+    for key, value in zip(header, values):
+        if value == "":
+            continue
+        field = create_model.model_fields.get(key)
+        if field is not None and get_origin(field.annotation) in (list, dict):
+            # List columns accept JSON or a '|'-separated shorthand
+            if value.lstrip().startswith(("[", "{")):
+                value = json.loads(value)
+            else:
+                value = [v.strip() for v in value.split("|") if v.strip()]
+        row[key] = value
+    return row
+
+async def iter_import_rows(request: Request, fmt: str, create_model) -> AsyncIterator[tuple]:
+    """Yield (line_number, row, error) for each non-empty record; `error` is set when it can't be read."""
+    feed = LineFeed()
+    reader = csv.reader(feed)
+    header = None
+    record_start = None
+    in_quotes = False
+    line_number = 0
+    async for raw_line in iter_body_lines(request):
+        line_number += 1
+        try:
+            line = raw_line.decode("utf-8")
+        except UnicodeDecodeError as e:
+            if fmt == "csv" and header is None:
+                raise HTTPException(status_code=400, detail=f"CSV header is not valid UTF-8: {e}")
+            # A bad line takes any partially read CSV record down with it
+            feed.clear()
+            in_quotes = False
+            yield record_start or line_number, None, e
+            record_start = None
+            continue
+        if line_number == 1:
+            # Excel prefixes UTF-8 exports with a byte order mark
+            line = line.lstrip("\ufeff")
+        
+        if fmt == "jsonl":
+            if line.strip():
+                try:
+                    row = json.loads(line)
+                except ValueError as e:
+                    yield line_number, None, e
+                else:
+                    yield line_number, row, None
+            continue
+        
+        if record_start is None:
+            if not line.strip():
+                continue
+            record_start = line_number
+        feed.push(line)
+        # Quotes (including "" escapes) balance out only at the end of a record
+        if line.count('"') % 2:
+            in_quotes = not in_quotes
+        if in_quotes:
+            continue
+        start, record_start = record_start, None
+        try:
+            values = next(reader)
+        except csv.Error as e:
+            feed.clear()
+            yield start, None, e
+            continue
+        if header is None:
+            header = [h.strip() for h in values]
+            continue
+        try:
+            row = parse_csv_row(header, values, create_model)
+        except ValueError as e:
+            yield start, None, e
+        else:
+            yield start, row, None
+    if record_start is not None:
+        yield record_start, None, ValueError("unterminated quoted field")
+
+@api_router.post("/admin/import/{collection}")
+async def import_catalog(collection: str, request: Request, fmt: str = Query("jsonl", alias="format")):
+    user = await get_current_user(request)
+    if not user:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    create_model, model = get_catalog_models(collection)
+    if fmt not in ("jsonl", "csv"):
+        raise HTTPException(status_code=400, detail="format must be 'jsonl' or 'csv'")
+    
+    report = {"collection": collection, "processed": 0, "inserted": 0, "updated": 0, "failed": 0, "errors": []}
+    
+    def add_error(line_number: int, error: str):
+        report["failed"] += 1
+        if len(report["errors"]) < IMPORT_MAX_ERRORS:
+            report["errors"].append({"line": line_number, "error": error})
+    
+    async def flush(items: List[BaseModel], line_numbers: List[int]):
+        docs = await to_catalog_docs(items, update_shared=True)
+        try:
+            # The reservation holds /sync back until the whole batch is written
+            async with change_versions.reserve(len(docs)) as first_version:
+                for offset, doc in enumerate(docs):
+                    doc['change_version'] = first_version + offset
+                # Upsert by id so re-running a migration doesn't duplicate items
+                ops = [ReplaceOne({"id": doc["id"]}, doc, upsert=True) for doc in docs]
+                try:
+                    result = await db[collection].bulk_write(ops, ordered=False)
+                except BulkWriteError as e:
+                    failed = {write_error["index"] for write_error in e.details.get("writeErrors", [])}
+                    await tombstones.clear(collection, (doc["id"] for i, doc in enumerate(docs) if i not in failed))
+                    raise
+                # Re-imported ids are live again
+                await tombstones.clear(collection, (doc["id"] for doc in docs))
+            report["inserted"] += result.upserted_count
+            report["updated"] += result.matched_count
+        except BulkWriteError as e:
+            details = e.details
+            report["inserted"] += details.get("nUpserted", 0)
+            report["updated"] += details.get("nMatched", 0)
+            for write_error in details.get("writeErrors", []):
+                add_error(line_numbers[write_error["index"]], write_error.get("errmsg", "write failed"))
+    
+    items, line_numbers = [], []
+    in_flight = None
+    try:
+        async for line_number, row, error in iter_import_rows(request, fmt, create_model):
+            report["processed"] += 1
+            try:
+                if error is not None:
+                    raise error
+                if not isinstance(row, dict):
+                    raise ValueError("expected a JSON object")
+                item = create_model(**row)
+                extra = {"id": str(row["id"])} if row.get("id") else {}
+                items.append(model(**item.model_dump(), **extra))
+            except Exception as e:
+                add_error(line_number, str(e))
+                continue
+            line_numbers.append(line_number)
+            if len(items) >= IMPORT_BATCH_SIZE:
+                # Keep parsing the next batch while this one is written
+                if in_flight:
+                    await in_flight
+                in_flight = asyncio.ensure_future(flush(items, line_numbers))
+                items, line_numbers = [], []
+        if in_flight:
+            await in_flight
+        if items:
+            await flush(items, line_numbers)
+    finally:
+        # Don't leave a batch writing in the background if the request failed
+        if in_flight and not in_flight.done():
+            in_flight.cancel()
+            await asyncio.gather(in_flight, return_exceptions=True)
+    
+    if report["inserted"] or report["updated"]:
+        await invalidation_bus.publish(collection, "refresh")
+    report["errors_truncated"] = report["failed"] > len(report["errors"])
+    return report
+
+@api_router.get("/admin/export/{collection}")
+async def export_catalog(collection: str, request: Request):
+    user = await get_current_user(request)
+    if not user:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    get_catalog_models(collection)
+    
+    async def export_lines():
+        # Exported items embed their resources so the file is self-contained
+        resolver = ResourceResolver(read_db)
+        cursor = read_db[collection].find({}, PUBLIC_PROJECTION).batch_size(EXPORT_BATCH_SIZE)
+        batch = []
+        async for doc in cursor:
+            batch.append(doc)
+            if len(batch) >= EXPORT_BATCH_SIZE:
+                yield "".join(json.dumps(d, default=str) + "\n" for d in await resolver.resolve(batch))
+                batch = []
+        if batch:
+            yield "".join(json.dumps(d, default=str) + "\n" for d in await resolver.resolve(batch))
+    
+    return StreamingResponse(
+        export_lines(),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="{collection}.ndjson"'}
+    )
+
+# ===== RESOURCES =====
+@api_router.get("/resources", response_model=List[Resource])
+async def get_resources(platform: Optional[str] = None, resource_type: Optional[str] = Query(None, alias="type")):
+    query = {}
+    if resource_type:
+        query['type'] = normalize_type(resource_type)
+    if platform:
+        query['platform'] = platform
+    
+    resources = await read_db.resources.find(query, {"_id": 0, "url_key": 0}).sort("title", 1).to_list(5000)
+    return resources
+
+@api_router.get("/resources/platforms")
+async def get_resource_platforms(resource_type: Optional[str] = Query(None, alias="type")):
+    # Served from the (type, platform) index instead of unwinding catalog documents
+    pipeline = []
+    if resource_type:
+        pipeline.append({"$match": {"type": normalize_type(resource_type)}})
+    pipeline += [
+        {"$group": {"_id": "$platform", "count": {"$sum": 1}}},
+        {"$sort": {"count": -1, "_id": 1}}
+    ]
+    platforms = await read_db.resources.aggregate(pipeline).to_list(None)
+    return [{"platform": p['_id'], "count": p['count']} for p in platforms]
+
+@api_router.post("/admin/resources/normalize")
+async def normalize_resources(request: Request):
+    user = await get_current_user(request)
+    if not user:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    migrated = await normalize_catalog_resources(db)
+    for collection in ("topics", "projects", "resources"):
+        await invalidation_bus.publish(collection, "refresh")
+    return {"migrated": migrated}
+
+# ===== RESOURCE LINK HEALTH =====
+LINK_CHECK_INTERVAL = int(os.environ.get('LINK_CHECK_INTERVAL_SECONDS', '3600'))
+LINK_CHECK_LEASE = timedelta(minutes=30)
+WORKER_ID = str(uuid.uuid4())
+
+async def annotate_link_status(items: List[dict]):
+    urls = [r['url'] for item in items for r in item.get('resources', []) if r.get('url')]
+    statuses = await link_checker.statuses_for(urls)
+    for item in items:
+        for resource in item.get('resources', []):
+            resource['link_status'] = statuses.get(resource.get('url'), LINK_UNCHECKED)
+
+async def collect_resource_urls() -> List[str]:
+    urls = set(await read_db.resources.distinct("url"))
+    # Items not yet moved to the resources collection
+    for collection in (db.topics, db.projects):
+        async for doc in collection.find({"resources": {"$exists": True}}, {"_id": 0, "resources.url": 1}):
+            urls.update(r['url'] for r in doc.get('resources', []) if r.get('url'))
+    return list(urls)
+
+async def acquire_link_check_lease() -> Optional[str]:
+    """Take the link check lease for one run; returns the holder id, or None if a run is in progress."""
+    # A holder per run, so a manual trigger can't re-enter a scheduled run on the same worker
+    holder = f"{WORKER_ID}:{uuid.uuid4()}"
+    if await acquire_lease(db, "link_checker", holder, LINK_CHECK_LEASE):
+        return holder
+    return None
+
+async def run_link_check(holder: str) -> Dict[str, int]:
+    try:
+        summary = await link_checker.check_due(await collect_resource_urls())
+    finally:
+        await release_lease(db, "link_checker", holder)
+    logger.info("Link check finished: %s", summary)
+    return summary
+
+async def link_check_loop():
+    while True:
+        try:
+            holder = await acquire_link_check_lease()
+            if holder:
+                await run_link_check(holder)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Link check failed")
+        await asyncio.sleep(LINK_CHECK_INTERVAL)
+
+async def run_triggered_link_check(holder: str):
+    try:
+        await run_link_check(holder)
+    except Exception:
+        logger.exception("Link check failed")
+
+@api_router.post("/admin/link-check", status_code=202)
+async def trigger_link_check(request: Request):
+    user = await get_current_user(request)
+    if not user:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    holder = await acquire_link_check_lease()
+    if not holder:
+        raise HTTPException(status_code=409, detail="A link check is already running")
+    task = asyncio.create_task(run_triggered_link_check(holder))
+    background_tasks.add(task)
+    task.add_done_callback(background_tasks.discard)
+    return {"message": "Link check started"}
+
+@api_router.get("/admin/link-check")
+async def get_link_check_summary(request: Request):
+    user = await get_current_user(request)
+    if not user:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    counts = await read_db.link_checks.aggregate([
+        {"$group": {"_id": "$status", "count": {"$sum": 1}}}
+    ]).to_list(None)
+    return {c['_id']: c['count'] for c in counts}
+
+# ===== CATALOG INDEXES =====
+async def load_catalog():
+    # Rebuilds follow writes, so read the primary rather than a lagging secondary
+    topics, projects = await asyncio.gather(
+        db.topics.find({}, PUBLIC_PROJECTION).sort("order", 1).to_list(None),
+        db.projects.find({}, PUBLIC_PROJECTION).to_list(None)
+    )
+    await ResourceResolver(db).resolve(topics + projects)
+    return topics, projects
+
+catalog_indexes = CatalogIndexes(
+    invalidation_bus,
+    load_catalog,
+    max_age=float(os.environ.get('CATALOG_INDEX_MAX_AGE_SECONDS', '60'))
+)
+catalog_indexes.register("topics_facets", lambda topics, projects: FacetIndex(topics))
+catalog_indexes.register("projects_facets", lambda topics, projects: FacetIndex(projects))
+catalog_indexes.register("autocomplete", build_autocomplete)
+
+# ===== RELATED ITEMS =====
+SIMILARITY_PROJECTION = {"_id": 0, "id": 1, "title": 1, "description": 1, "difficulty": 1, "skills": 1, "career_paths": 1}
+RELATED_ITEMS_K = int(os.environ.get('RELATED_ITEMS_K', '10'))
+
+async def load_similarity_items():
+    topics, projects = await asyncio.gather(
+        db.topics.find({}, SIMILARITY_PROJECTION).to_list(None),
+        db.projects.find({}, SIMILARITY_PROJECTION).to_list(None)
+    )
+    return [("topic", t) for t in topics] + [("project", p) for p in projects]
+
+async def fetch_similarity_item(item_type: str, item_id: str):
+    collection = db.topics if item_type == "topic" else db.projects
+    return await collection.find_one({"id": item_id}, SIMILARITY_PROJECTION)
+
+related_items = RelatedItems(invalidation_bus, load_similarity_items, fetch_similarity_item, k=RELATED_ITEMS_K)
+
+@api_router.get("/topics/{topic_id}/related")
+async def get_related_topics(topic_id: str, limit: int = Query(5, ge=1, le=RELATED_ITEMS_K)):
+    related = await related_items.related("topic", topic_id, limit)
+    if related is None:
+        raise HTTPException(status_code=404, detail="Topic not found")
+    return related
+
+@api_router.get("/projects/{project_id}/related")
+async def get_related_projects(project_id: str, limit: int = Query(5, ge=1, le=RELATED_ITEMS_K)):
+    related = await related_items.related("project", project_id, limit)
+    if related is None:
+        raise HTTPException(status_code=404, detail="Project not found")
+    return related
+
+# ===== FACETED FILTERING =====
+@api_router.get("/facets/{collection}", response_class=ORJSONResponse)
+async def get_faceted(
+    collection: str,
+    difficulty: Optional[List[str]] = Query(None),
+    career_path: Optional[List[str]] = Query(None),
+    skill: Optional[List[str]] = Query(None),
+    duration: Optional[List[str]] = Query(None),
+    platform: Optional[List[str]] = Query(None),
+    pricing: Optional[List[str]] = Query(None),
+    offset: int = Query(0, ge=0),
+    limit: int = Query(100, ge=0, le=1000)
+):
+    get_catalog_models(collection)
+    index = await catalog_indexes.get(f"{collection}_facets")
+    matches, counts = index.query({
+        "difficulty": difficulty,
+        "career_path": career_path,
+        "skill": skill,
+        "duration": duration,
+        "platform": platform,
+        "pricing": [p.lower() for p in pricing] if pricing else None
+    })
+    return ORJSONResponse({
+        "total": matches.bit_count(),
+        "items": index.select(matches, offset, limit),
+        "facets": counts
+    })
+
+# ===== AUTOCOMPLETE =====
+@api_router.get("/autocomplete")
+async def autocomplete(prefix: str = Query(..., max_length=100), limit: int = Query(8, ge=1, le=10)):
+    prefix = normalize_prefix(prefix)
+    if not prefix:
+        return []
+    trie = await catalog_indexes.get("autocomplete")
+    return trie.complete(prefix, limit)
+
+# ===== DEBUG PROFILES =====
+@api_router.get("/debug/profiles/{profile_id}")
+async def get_debug_profile(profile_id: str, request: Request, fmt: str = Query("json", alias="format")):
+    if not DEBUG_PROFILE_TOKEN:
+        raise HTTPException(status_code=404, detail="Profiling is disabled")
+    if not check_profile_token(request.headers.get(PROFILE_HEADER), DEBUG_PROFILE_TOKEN):
+        raise HTTPException(status_code=403, detail="Invalid profiling token")
+    
+    profile = await db.debug_profiles.find_one({"id": profile_id}, {"_id": 0, "expires_at": 0})
+    if not profile:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    if fmt == "collapsed":
+        # Feed to flamegraph.pl or speedscope
+        return PlainTextResponse(profile['collapsed'])
+    return ORJSONResponse(profile)
+
+# ===== DELTA SYNC =====
+@api_router.get("/sync", response_class=ORJSONResponse)
+async def sync(request: Request, since: int = Query(0, ge=0)):
+    # Take the watermark before querying: every write at or below it is visible,
+    # and anything newer that the queries happen to return is sent again next time
+    version = await change_versions.watermark()
+    if since > version:
+        # The client's version comes from another database; start over
+        since = 0
+    
+    query = {"change_version": {"$gt": since}} if since else {}
+    user = await get_current_user(request)
+    
+    # Sync must see every write up to `version`, so it reads the primary
+    topics, projects, progress, deleted = await asyncio.gather(
+        db.topics.find(query, PUBLIC_PROJECTION).to_list(None),
+        db.projects.find(query, PUBLIC_PROJECTION).to_list(None),
+        db.progress.find({"user_id": user.id, **query}, PUBLIC_PROJECTION).to_list(None) if user else asyncio.sleep(0, []),
+        tombstones.since(since)
+    )
+    await ResourceResolver(db).resolve(topics + projects)
+    
+    return ORJSONResponse({
+        "version": version,
+        "full": since == 0,
+        "topics": topics,
+        "projects": projects,
+        "progress": progress,
+        "deleted": deleted
+    })
+
 # ===== SEARCH =====
-@api_router.get("/search")
+@api_router.get("/search", response_class=ORJSONResponse)
 async def search(q: str):
-    topics = await db.topics.find(
-        {"$or": [
-            {"title": {"$regex": q, "$options": "i"}},
-            {"description": {"$regex": q, "$options": "i"}}
-        ]},
-        {"_id": 0}
-    ).to_list(50)
-    
-    projects = await db.projects.find(
-        {"$or": [
-            {"title": {"$regex": q, "$options": "i"}},
-            {"description": {"$regex": q, "$options": "i"}}
-        ]},
-        {"_id": 0}
-    ).to_list(50)
+    # The regexes are case-insensitive, so case-folded queries share a flight
+    # (unless they contain escapes like \S, whose meaning depends on case)
+    if "\\" not in q:
+        q = q.lower()
     
-    return {
-        "topics": topics,
-        "projects": projects
-    }
+    async def produce():
+        topics = await read_db.topics.find(
+            {"$or": [
+                {"title": {"$regex": q, "$options": "i"}},
+                {"description": {"$regex": q, "$options": "i"}}
+            ]},
+            PUBLIC_PROJECTION
+        ).to_list(50)
+        
+        projects = await read_db.projects.find(
+            {"$or": [
+                {"title": {"$regex": q, "$options": "i"}},
+                {"description": {"$regex": q, "$options": "i"}}
+            ]},
+            PUBLIC_PROJECTION
+        ).to_list(50)
+        
+        await ResourceResolver(read_db).resolve(topics + projects)
+        return orjson.dumps({
+            "topics": topics,
+            "projects": projects
+        })
+    
+    return await coalesced_json(("search", q), produce)
+
+@api_router.get("/metrics/singleflight")
+async def get_singleflight_metrics():
+    return read_flight.metrics()
 
 app.include_router(api_router)
 
+if DEBUG_PROFILE_TOKEN:
+    app.add_middleware(
+        ProfilingMiddleware,
+        token=DEBUG_PROFILE_TOKEN,
+        store=db.debug_profiles,
+        interval=float(os.environ.get('DEBUG_PROFILE_INTERVAL_MS', '1')) / 1000,
+        # Fetching a report shouldn't store another one
+        skip_paths=("/api/debug/profiles",)
+    )
+
 app.add_middleware(
     CORSMiddleware,
     allow_credentials=True,
@@ -514,6 +1454,42 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Long-running tasks owned by this worker, cancelled on shutdown
+background_tasks = set()
+
+@app.on_event("startup")
+async def start_invalidation_bus():
+    if os.environ.get('CACHE_INVALIDATION_STREAMS', 'true').lower() != 'false':
+        await invalidation_bus.start()
+
+@app.on_event("startup")
+async def create_resource_indexes():
+    await ensure_resource_indexes(db)
+
+@app.on_event("startup")
+async def create_sync_indexes():
+    await db.topics.create_index([("change_version", ASCENDING)])
+    await db.projects.create_index([("change_version", ASCENDING)])
+    await db.progress.create_index([("user_id", ASCENDING), ("change_version", ASCENDING)])
+    await db.tombstones.create_index([("change_version", ASCENDING)])
+    await db.tombstones.create_index([("collection", ASCENDING), ("id", ASCENDING)])
+
+@app.on_event("startup")
+async def create_profile_indexes():
+    if DEBUG_PROFILE_TOKEN:
+        await db.debug_profiles.create_index("id", unique=True)
+        await db.debug_profiles.create_index("expires_at", expireAfterSeconds=0)
+
+@app.on_event("startup")
+async def start_link_checker():
+    await link_checker.ensure_indexes()
+    if LINK_CHECK_INTERVAL > 0:
+        background_tasks.add(asyncio.create_task(link_check_loop()))
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    for task in background_tasks:
+        task.cancel()
+    await invalidation_bus.stop()
+    link_checker.close()
     client.close()
\ No newline at end of file
@@ -0,0 +1,222 @@
+import asyncio
+import math
+import re
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from scipy import sparse
+
+TOKEN_RE = re.compile(r"[a-z][a-z0-9+#]+")
+STOPWORDS = {
+    "and", "the", "for", "with", "from", "into", "your", "you", "using", "use", "how", "that",
+    "this", "are", "build", "learn", "data", "its", "their", "of", "to", "in", "on", "an",
+}
+# Structured catalog fields say more about relatedness than free text does
+FEATURE_WEIGHTS = {"skill": 2.0, "path": 1.0, "difficulty": 0.5, "word": 1.0}
+
+ItemKey = Tuple[str, str]  # (item_type, id)
+
+
+def item_terms(item: Dict[str, Any]) -> Counter:
+    terms = Counter()
+    for skill in item.get("skills", []):
+        terms[f"skill:{skill.lower()}"] += 1
+    for path in item.get("career_paths", []):
+        terms[f"path:{path.lower()}"] += 1
+    if item.get("difficulty"):
+        terms[f"difficulty:{item['difficulty'].lower()}"] += 1
+    text = f"{item.get('title', '')} {item.get('description', '')}".lower()
+    for word in TOKEN_RE.findall(text):
+        if word not in STOPWORDS:
+            terms[f"word:{word}"] += 1
+    return terms
+
+
+def summarize(item_type: str, item: Dict[str, Any]) -> Dict[str, Any]:
+    return {"id": item["id"], "type": item_type, "title": item.get("title", ""), "difficulty": item.get("difficulty", "")}
+
+
+class SimilarityIndex:
+    """Top-k related catalog items from TF-IDF cosine similarity.
+
+    Neighbors for every item are precomputed with chunked sparse matrix
+    products, so lookups are a dict access. Single-item changes are applied
+    incrementally against the existing vocabulary and IDF weights; new terms
+    only count after the next full build.
+    """
+
+    def __init__(self, items: Iterable[Tuple[str, Dict[str, Any]]], k: int = 5, chunk_size: int = 1024):
+        self.k = k
+        self.chunk_size = chunk_size
+        items = list(items)
+        self.keys: List[Optional[ItemKey]] = [(t, item["id"]) for t, item in items]
+        self.rows: Dict[ItemKey, int] = {key: i for i, key in enumerate(self.keys)}
+        self.summaries: Dict[ItemKey, Dict[str, Any]] = {(t, item["id"]): summarize(t, item) for t, item in items}
+        self.updates_since_build = 0
+
+        term_counts = [item_terms(item) for _, item in items]
+        document_frequency = Counter(term for counts in term_counts for term in counts)
+        self.vocabulary = {term: col for col, term in enumerate(sorted(document_frequency))}
+        n = max(len(items), 1)
+        self.idf = np.array([
+            math.log((1 + n) / (1 + document_frequency[term])) + 1.0 for term in sorted(document_frequency)
+        ])
+        self.matrix = sparse.vstack(
+            [self._vectorize(counts) for counts in term_counts], format="csr"
+        ) if items else sparse.csr_matrix((0, len(self.vocabulary)))
+        self.neighbors: Dict[ItemKey, List[Tuple[ItemKey, float]]] = {}
+        self._recompute_rows(list(range(len(self.keys))))
+
+    def _vectorize(self, counts: Counter) -> sparse.csr_matrix:
+        cols, values = [], []
+        for term, count in counts.items():
+            col = self.vocabulary.get(term)
+            if col is not None:
+                weight = FEATURE_WEIGHTS[term.split(":", 1)[0]]
+                cols.append(col)
+                values.append((1 + math.log(count)) * weight * self.idf[col])
+        values = np.array(values, dtype=np.float64)
+        norm = np.linalg.norm(values)
+        if norm:
+            values /= norm
+        return sparse.csr_matrix((values, (np.zeros(len(cols), dtype=np.int64), cols)), shape=(1, len(self.vocabulary)))
+
+    def _recompute_rows(self, rows: List[int]):
+        rows = [r for r in rows if self.keys[r] is not None]
+        for start in range(0, len(rows), self.chunk_size):
+            chunk = rows[start:start + self.chunk_size]
+            scores = (self.matrix[chunk] @ self.matrix.T).tocsr()
+            for offset, row in enumerate(chunk):
+                self.neighbors[self.keys[row]] = self._top_k(row, scores, offset)
+
+    def _top_k(self, row: int, scores: sparse.csr_matrix, offset: int) -> List[Tuple[ItemKey, float]]:
+        start, end = scores.indptr[offset], scores.indptr[offset + 1]
+        cols = scores.indices[start:end]
+        values = scores.data[start:end]
+        keep = (cols != row) & (values > 0)
+        cols, values = cols[keep], values[keep]
+        if len(values) > self.k:
+            best = np.argpartition(-values, self.k)[:self.k]
+            cols, values = cols[best], values[best]
+        order = np.argsort(-values, kind="stable")
+        return [(self.keys[cols[i]], float(values[i])) for i in order if self.keys[cols[i]] is not None]
+
+    # ===== INCREMENTAL UPDATES =====
+    def upsert(self, item_type: str, item: Dict[str, Any]):
+        key = (item_type, item["id"])
+        vector = self._vectorize(item_terms(item))
+        row = self.rows.get(key)
+        if row is None:
+            row = len(self.keys)
+            self.keys.append(key)
+            self.rows[key] = row
+            self.matrix = sparse.vstack([self.matrix, vector], format="csr")
+        else:
+            self.matrix = sparse.vstack([self.matrix[:row], vector, self.matrix[row + 1:]], format="csr")
+        self.summaries[key] = summarize(item_type, item)
+        self._refresh_around(row)
+
+    def remove(self, item_type: str, item_id: str):
+        key = (item_type, item_id)
+        row = self.rows.pop(key, None)
+        if row is None:
+            return
+        empty = sparse.csr_matrix((1, self.matrix.shape[1]))
+        self.matrix = sparse.vstack([self.matrix[:row], empty, self.matrix[row + 1:]], format="csr")
+        self.keys[row] = None
+        self.summaries.pop(key, None)
+        self.neighbors.pop(key, None)
+        self._refresh_around(row, removed_key=key)
+
+    def _refresh_around(self, row: int, removed_key: Optional[ItemKey] = None):
+        self.updates_since_build += 1
+        key = removed_key or self.keys[row]
+        # Items that listed the changed item, or might now rank it, need new lists
+        scores = np.asarray((self.matrix @ self.matrix[row].T).todense()).ravel()
+        affected = []
+        for other, neighbors in self.neighbors.items():
+            other_row = self.rows[other]
+            if other_row == row:
+                continue
+            listed = any(n == key for n, _ in neighbors)
+            floor = neighbors[-1][1] if len(neighbors) >= self.k else 0.0
+            if listed or scores[other_row] > floor:
+                affected.append(other_row)
+        self._recompute_rows(([row] if removed_key is None else []) + affected)
+
+    @property
+    def size(self) -> int:
+        return len(self.rows)
+
+    def related(self, item_type: str, item_id: str, limit: Optional[int] = None) -> Optional[List[Dict[str, Any]]]:
+        neighbors = self.neighbors.get((item_type, item_id))
+        if neighbors is None:
+            return None
+        return [
+            {**self.summaries[key], "score": round(score, 4)}
+            for key, score in neighbors[:limit or self.k]
+        ]
+
+
+COLLECTION_TYPES = {"topics": "topic", "projects": "project"}
+
+
+class RelatedItems:
+    """Keeps a SimilarityIndex in step with catalog writes seen on the invalidation bus.
+
+    Events only queue the changed ids, so writers never wait on the matrix
+    work; queued changes are applied before the next lookup. Full rebuilds
+    happen on refresh events, on deletes whose id is unknown, and once enough
+    incremental updates have piled up to make the IDF weights drift.
+    """
+
+    def __init__(self, bus, loader, fetch, k: int = 5, rebuild_ratio: float = 0.2):
+        self.loader = loader
+        self.fetch = fetch
+        self.k = k
+        self.rebuild_ratio = rebuild_ratio
+        self._index: Optional[SimilarityIndex] = None
+        self._pending: Dict[ItemKey, str] = {}
+        self._generation = 0
+        self._lock = asyncio.Lock()
+        bus.subscribe(COLLECTION_TYPES, self._on_event)
+
+    def _on_event(self, event):
+        if event.operation == "refresh" or event.doc_id is None:
+            self._generation += 1
+            self._index = None
+            self._pending.clear()
+        else:
+            self._pending[(COLLECTION_TYPES[event.collection], event.doc_id)] = event.operation
+
+    async def _build(self) -> SimilarityIndex:
+        return await asyncio.to_thread(SimilarityIndex, await self.loader(), self.k)
+
+    async def _ensure_current(self) -> SimilarityIndex:
+        while True:
+            generation = self._generation
+            index = self._index
+            if index is None:
+                self._pending.clear()
+                index = await self._build()
+            while self._pending and generation == self._generation:
+                (item_type, item_id), operation = self._pending.popitem()
+                item = None if operation == "delete" else await self.fetch(item_type, item_id)
+                if item is None:
+                    index.remove(item_type, item_id)
+                else:
+                    index.upsert(item_type, item)
+            if index.updates_since_build > max(self.rebuild_ratio * index.size, 10):
+                index = await self._build()
+            # A refresh that arrived mid-build invalidates what we just built
+            if generation == self._generation:
+                self._index = index
+                return index
+
+    async def related(self, item_type: str, item_id: str, limit: Optional[int] = None) -> Optional[List[Dict[str, Any]]]:
+        index = self._index
+        if index is None or self._pending:
+            async with self._lock:
+                index = await self._ensure_current()
+        return index.related(item_type, item_id, limit)
@@ -0,0 +1,59 @@
+import asyncio
+from collections import defaultdict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple, TypeVar
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """Coalesces concurrent calls with the same key into one execution.
+
+    The first caller for a key starts the work as its own task; callers that
+    arrive before it finishes await the same task and share its result (or
+    exception). Cancelling one waiter doesn't cancel the shared work. Keys
+    should start with a route name, which is used to group the metrics.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self._calls: Dict[str, int] = defaultdict(int)
+        self._executions: Dict[str, int] = defaultdict(int)
+
+    async def do(self, key: Tuple[Hashable, ...], fn: Callable[[], Awaitable[T]]) -> T:
+        route = str(key[0])
+        self._calls[route] += 1
+        future = self._inflight.get(key)
+        if future is None:
+            self._executions[route] += 1
+            future = asyncio.ensure_future(fn())
+            self._inflight[key] = future
+            future.add_done_callback(lambda f: self._forget(key, f))
+        return await asyncio.shield(future)
+
+    def _forget(self, key: Hashable, future: asyncio.Future):
+        if self._inflight.get(key) is future:
+            del self._inflight[key]
+        if not future.cancelled():
+            # Mark the exception as retrieved when every waiter went away
+            future.exception()
+
+    def metrics(self) -> Dict[str, Any]:
+        routes = {}
+        for route, calls in self._calls.items():
+            executions = self._executions[route]
+            routes[route] = {
+                "calls": calls,
+                "executions": executions,
+                "coalesced": calls - executions,
+                "coalescing_ratio": round((calls - executions) / calls, 4) if calls else 0.0,
+            }
+        calls = sum(self._calls.values())
+        executions = sum(self._executions.values())
+        return {
+            "calls": calls,
+            "executions": executions,
+            "coalesced": calls - executions,
+            "coalescing_ratio": round((calls - executions) / calls, 4) if calls else 0.0,
+            "in_flight": len(self._inflight),
+            "routes": routes,
+        }
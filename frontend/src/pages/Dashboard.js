@@ -30,27 +30,12 @@ const Dashboard = () => {
 
   const fetchData = async () => {
     try {
-      const [statsRes, progressRes, topicsRes] = await Promise.all([
-        axios.get(`${API}/stats`),
-        axios.get(`${API}/progress`),
-        axios.get(`${API}/topics`)
-      ]);
+      const { data } = await axios.get(`${API}/dashboard`);
 
-      setStats(statsRes.data);
-      setProgress(progressRes.data);
-      
-      const inProgressTopics = progressRes.data
-        .filter(p => p.item_type === 'topic' && p.status === 'in_progress')
-        .slice(0, 3);
-      
-      const topicDetails = await Promise.all(
-        inProgressTopics.map(p => axios.get(`${API}/topics/${p.item_id}`))
-      );
-      
-      setRecentTopics(topicDetails.map((res, idx) => ({
-        ...res.data,
-        progress: inProgressTopics[idx].progress_percentage
-      })));
+      setUser(data.user);
+      setStats(data.stats);
+      setProgress(data.progress);
+      setRecentTopics(data.recent_topics);
     } catch (error) {
       console.error('Error fetching data:', error);
       toast.error('Failed to load dashboard data');
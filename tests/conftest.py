@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# Backend modules import each other as top-level modules (`from cache_bus import ...`)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
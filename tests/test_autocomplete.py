@@ -0,0 +1,70 @@
+import random
+
+from autocomplete import CompressedTrie, build_autocomplete, normalize_prefix
+
+
+def topic(title, order, platforms=()):
+    return {
+        "id": f"t-{order}",
+        "title": title,
+        "order": order,
+        "resources": [{"platform": p} for p in platforms],
+    }
+
+
+def test_matching_title_outranks_frequent_platform():
+    # Coursera and DataCamp show up on every item, so raw frequency would put them first
+    topics = [
+        topic("Cloud Platforms", 10, ["Coursera", "DataCamp"]),
+        topic("Introduction to Data Analytics", 1, ["Coursera", "DataCamp"]),
+        topic("Excel for Data Analysis", 3, ["Coursera", "DataCamp"]),
+    ]
+    projects = [
+        {"id": "p-1", "title": "Churn Model", "skills": ["Python"], "resources": [{"platform": "Coursera"}]},
+    ]
+    trie = build_autocomplete(topics, projects)
+
+    c = trie.complete("c")
+    assert c[0] == {"text": "Cloud Platforms", "type": "topic", "id": "t-10"}
+    assert c.index({"text": "Churn Model", "type": "project", "id": "p-1"}) < c.index({"text": "Coursera", "type": "platform"})
+
+    data = [s["type"] for s in trie.complete("data")]
+    assert data == ["topic", "topic", "platform"]
+
+
+def brute_force(entries, prefix, k):
+    matches = sorted(
+        ((-score, suggestion["text"]), suggestion)
+        for key, suggestion, score in entries if key.startswith(prefix)
+    )
+    seen, top = set(), []
+    for _, suggestion in matches:
+        identity = (suggestion["type"], suggestion.get("id"), suggestion["text"])
+        if identity not in seen:
+            seen.add(identity)
+            top.append(suggestion)
+    return top[:k]
+
+
+def test_complete_matches_brute_force_prefix_filter():
+    rng = random.Random(7)
+    k = 5
+    entries = []
+    for i in range(400):
+        key = "".join(rng.choice("abc ") for _ in range(rng.randint(1, 8))).strip() or "a"
+        suggestion = {"text": f"{key}#{i % 50}", "type": "topic", "id": str(i % 50)}
+        entries.append((key, suggestion, float(rng.randint(0, 20))))
+
+    trie = CompressedTrie(k)
+    for key, suggestion, score in entries:
+        trie.insert(key, suggestion, score)
+    trie.finalize()
+
+    prefixes = {key[:n] for key, _, _ in entries for n in range(1, len(key) + 1)} | {"abcabcabc", "cc c", "zz"}
+    for prefix in sorted(prefixes):
+        assert trie.complete(prefix) == brute_force(entries, prefix, k), prefix
+        assert trie.complete(prefix, 2) == brute_force(entries, prefix, 2), prefix
+
+
+def test_normalize_prefix_folds_case_and_whitespace():
+    assert normalize_prefix("  Advanced   SQL ") == "advanced sql"
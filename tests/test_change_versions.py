@@ -0,0 +1,153 @@
+import asyncio
+from datetime import timedelta
+
+from mongomock_motor import AsyncMongoMockClient
+
+from change_versions import ChangeVersions, Tombstones
+
+
+def make_db():
+    return AsyncMongoMockClient()["test"]
+
+
+async def sync_delta(db, versions, since):
+    """What /sync does: take the watermark, then query everything newer than `since`."""
+    watermark = await versions.watermark()
+    docs = await db.items.find({"change_version": {"$gt": since}}, {"_id": 0}).to_list(None)
+    return watermark, {d["id"] for d in docs}
+
+
+def test_sync_during_a_reserved_write_does_not_skip_it():
+    async def run():
+        db = make_db()
+        versions = ChangeVersions(db.counters)
+        async with versions.reserve() as version:
+            await db.items.insert_one({"id": "a", "change_version": version})
+
+        async with versions.reserve() as version:
+            # A sync lands between the reservation and the write
+            watermark, seen = await sync_delta(db, versions, 0)
+            await db.items.insert_one({"id": "b", "change_version": version})
+
+        # The next sync starts from the watermark the client was given
+        next_watermark, next_seen = await sync_delta(db, versions, watermark)
+        return watermark, seen, next_watermark, next_seen
+
+    watermark, seen, next_watermark, next_seen = asyncio.run(run())
+    assert watermark == 1
+    assert seen == {"a"}
+    assert next_watermark == 2
+    assert next_seen == {"b"}
+
+
+def test_watermark_waits_for_the_oldest_unfinished_reservation():
+    async def run():
+        versions = ChangeVersions(make_db().counters)
+        marks = []
+        first = versions.reserve(3)
+        second = versions.reserve(2)
+        assert await first.__aenter__() == 1
+        assert await second.__aenter__() == 4
+        marks.append(await versions.watermark())
+        await second.__aexit__(None, None, None)
+        marks.append(await versions.watermark())
+        await first.__aexit__(None, None, None)
+        marks.append(await versions.watermark())
+        return marks
+
+    assert asyncio.run(run()) == [0, 0, 5]
+
+
+def test_failed_write_releases_its_reservation():
+    async def run():
+        versions = ChangeVersions(make_db().counters)
+        try:
+            async with versions.reserve():
+                raise RuntimeError("write failed")
+        except RuntimeError:
+            pass
+        return await versions.watermark()
+
+    assert asyncio.run(run()) == 1
+
+
+def test_expired_reservation_stops_holding_the_watermark_back():
+    async def run():
+        db = make_db()
+        versions = ChangeVersions(db.counters, ttl=timedelta(0))
+        await versions.reserve().__aenter__()  # never released, as if the writer crashed
+        watermark = await versions.watermark()
+        counter = await db.counters.find_one({"_id": "change_version"})
+        return watermark, counter["pending"]
+
+    watermark, pending = asyncio.run(run())
+    assert watermark == 1
+    assert pending == []
+
+
+def test_concurrent_reservations_get_disjoint_ranges():
+    async def run():
+        versions = ChangeVersions(make_db().counters)
+
+        async def reserve(count):
+            async with versions.reserve(count) as first:
+                await asyncio.sleep(0)
+                return range(first, first + count)
+
+        ranges = await asyncio.gather(*(reserve(n % 3 + 1) for n in range(20)))
+        return ranges, await versions.watermark()
+
+    ranges, watermark = asyncio.run(run())
+    allocated = sorted(v for r in ranges for v in r)
+    assert allocated == list(range(1, len(allocated) + 1))
+    assert watermark == len(allocated)
+
+
+def test_reservation_retries_when_another_writer_advances_the_counter():
+    async def run():
+        db = make_db()
+        versions = ChangeVersions(db.counters)
+        competitor = ChangeVersions(db.counters)
+        read_counter = db.counters.find_one
+        interleaved = []
+
+        async def find_one_then_compete(*args, **kwargs):
+            counter = await read_counter(*args, **kwargs)
+            if not interleaved:
+                interleaved.append(None)
+                # Another worker reserves between our read and our compare-and-set
+                interleaved[0] = await competitor._reserve(2)
+            return counter
+
+        versions.collection.find_one = find_one_then_compete
+        async with versions.reserve() as version:
+            pass
+        return version, interleaved[0][1]
+
+    version, competitor_first = asyncio.run(run())
+    assert competitor_first == 1
+    assert version == 3
+
+
+def test_reinserted_item_is_not_also_reported_deleted():
+    async def run():
+        db = make_db()
+        versions = ChangeVersions(db.counters)
+        tombstones = Tombstones(db.tombstones, versions)
+        async with versions.reserve() as version:
+            await db.items.insert_one({"id": "a", "change_version": version})
+        client_version = await versions.watermark()
+
+        # Deleted, then the same id is imported again
+        await db.items.delete_one({"id": "a"})
+        await tombstones.record("topics", "a")
+        async with versions.reserve() as version:
+            await db.items.insert_one({"id": "a", "change_version": version})
+            await tombstones.clear("topics", ["a"])
+
+        _, seen = await sync_delta(db, versions, client_version)
+        return seen, await tombstones.since(client_version)
+
+    seen, deleted = asyncio.run(run())
+    assert seen == {"a"}
+    assert deleted["topics"] == []
@@ -0,0 +1,182 @@
+import asyncio
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from mongomock_motor import AsyncMongoMockClient
+
+from link_checker import LINK_BROKEN, LINK_INVALID, LINK_OK, LinkChecker
+
+ETAG = '"v1"'
+LAST_MODIFIED = "Wed, 01 Jan 2025 00:00:00 GMT"
+SLOW_SECONDS = 0.2
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """Serves /page (with validators), /gone (404) and /slow/* (tracks concurrency)."""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_HEAD(self):
+        server = self.server
+        server.requests.append((self.command, self.path, dict(self.headers)))
+        if self.path == "/page":
+            if self.headers.get("If-None-Match") == ETAG:
+                self._reply(304)
+            else:
+                self._reply(200, {"ETag": ETAG, "Last-Modified": LAST_MODIFIED})
+        elif self.path.startswith("/slow/"):
+            with server.lock:
+                server.active += 1
+                server.max_active = max(server.max_active, server.active)
+            time.sleep(SLOW_SECONDS)
+            with server.lock:
+                server.active -= 1
+            self._reply(200)
+        else:
+            self._reply(404)
+
+    do_GET = do_HEAD
+
+    def _reply(self, status, headers=None):
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture(scope="module")
+def stand_in():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandInHandler)
+    server.daemon_threads = True
+    server.lock = threading.Lock()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def base_url(stand_in):
+    stand_in.requests = []
+    stand_in.active = 0
+    stand_in.max_active = 0
+    return f"http://127.0.0.1:{stand_in.server_address[1]}"
+
+
+def make_checker(**kwargs):
+    return LinkChecker(AsyncMongoMockClient()["test"], **kwargs)
+
+
+async def stored(checker, url):
+    return await checker.collection.find_one({"url": url}, {"_id": 0})
+
+
+def test_recheck_sends_stored_validators_and_accepts_304(stand_in, base_url):
+    checker = make_checker()
+    url = f"{base_url}/page"
+
+    async def run():
+        first = await checker.check_due([url])
+        after_first = await stored(checker, url)
+        later = datetime.now(timezone.utc) + timedelta(days=8)
+        second = await checker.check_due([url], now=later)
+        return first, after_first, second, await stored(checker, url)
+
+    try:
+        first, after_first, second, after_second = asyncio.run(run())
+    finally:
+        checker.close()
+
+    assert first == {"total": 1, "checked": 1, LINK_OK: 1}
+    assert after_first["http_status"] == 200
+    assert after_first["etag"] == ETAG
+    assert after_first["last_modified"] == LAST_MODIFIED
+
+    assert second == {"total": 1, "checked": 1, LINK_OK: 1}
+    _, _, headers = stand_in.requests[-1]
+    assert headers["If-None-Match"] == ETAG
+    assert headers["If-Modified-Since"] == LAST_MODIFIED
+    assert after_second["http_status"] == 304
+    assert after_second["status"] == LINK_OK
+    # A 304 carries no validators of its own; the stored ones are kept
+    assert after_second["etag"] == ETAG
+    assert after_second["last_modified"] == LAST_MODIFIED
+
+
+def test_broken_link_backs_off_exponentially(base_url):
+    retry_base = timedelta(hours=1)
+    checker = make_checker(retry_base=retry_base, retry_max=timedelta(hours=3))
+    url = f"{base_url}/gone"
+
+    def delay(doc):
+        return datetime.fromisoformat(doc["next_check_at"]) - datetime.fromisoformat(doc["checked_at"])
+
+    async def run():
+        docs = []
+        summaries = [await checker.check_due([url])]
+        docs.append(await stored(checker, url))
+        # Not due again until the retry delay has passed
+        summaries.append(await checker.check_due([url]))
+        for _ in range(2):
+            summaries.append(await checker.check_due([url], now=datetime.now(timezone.utc) + timedelta(days=1)))
+            docs.append(await stored(checker, url))
+        return summaries, docs
+
+    try:
+        summaries, docs = asyncio.run(run())
+    finally:
+        checker.close()
+
+    assert summaries[0] == {"total": 1, "checked": 1, LINK_BROKEN: 1}
+    assert summaries[1] == {"total": 1, "checked": 0}
+    assert [d["status"] for d in docs] == [LINK_BROKEN] * 3
+    assert [d["http_status"] for d in docs] == [404] * 3
+    assert [d["failures"] for d in docs] == [1, 2, 3]
+    assert [delay(d) for d in docs] == [retry_base, 2 * retry_base, timedelta(hours=3)]
+
+
+def test_malformed_urls_are_recorded_without_losing_other_results(base_url):
+    checker = make_checker()
+    good = f"{base_url}/page"
+    malformed = ["http://[::1", f"http://{'a' * 70}.example.com/", "not a url"]
+
+    async def run():
+        summary = await checker.check_due(malformed + [good])
+        return summary, {u: await stored(checker, u) for u in malformed + [good]}
+
+    try:
+        summary, docs = asyncio.run(run())
+    finally:
+        checker.close()
+
+    assert summary == {"total": 4, "checked": 4, LINK_INVALID: 3, LINK_OK: 1}
+    for url in malformed:
+        assert docs[url]["status"] == LINK_INVALID
+        assert docs[url]["error"]
+        assert docs[url]["failures"] == 1
+    assert docs[good]["status"] == LINK_OK
+
+
+def test_per_host_concurrency_is_bounded(stand_in, base_url):
+    checker = make_checker(concurrency=16, per_host=2)
+    urls = [f"{base_url}/slow/{i}" for i in range(8)]
+
+    try:
+        started = time.monotonic()
+        summary = asyncio.run(checker.check_due(urls))
+        elapsed = time.monotonic() - started
+    finally:
+        checker.close()
+
+    assert summary == {"total": 8, "checked": 8, LINK_OK: 8}
+    assert stand_in.max_active == 2
+    # Eight requests, two at a time
+    assert elapsed >= 4 * SLOW_SECONDS